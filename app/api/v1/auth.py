@@ -5,9 +5,16 @@ from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 import jwt
 import os
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
 from app.db.mongo import users_collection
-from app.auth_utils import hash_password, verify_password, create_access_token
+from app.core.config import settings
+from app.core.cache import get_cache
+from app.core.executor import run_blocking
+from app.core.http import get_http_client
+from app.auth_utils import (
+    hash_password_async, verify_password_async, create_access_token,
+    PasswordHashBusy)
 from app.api.v1.schemas import UserCreate, UserDB, Token
 
 router = APIRouter()
@@ -23,6 +30,40 @@ GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Authenticated users by email so get_current_user skips Mongo on a hit
+user_cache = get_cache("auth_users", maxsize=settings.AUTH_CACHE_SIZE,
+                       ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+
+async def invalidate_cached_user(email: str):
+    """
+    Drop a cached user; call whenever a user record is written
+    """
+    await user_cache.delete(email)
+
+
+async def insert_oauth_user(user_doc: dict) -> str:
+    """
+    Create a user signing in through a provider, or return the id of the
+    one a concurrent sign-in created with the same email
+    """
+    try:
+        result = await users_collection.insert_one(user_doc)
+    except DuplicateKeyError:
+        user = await users_collection.find_one(
+            {"email": user_doc["email"]}, {"_id": 1})
+        return str(user["_id"])
+    await invalidate_cached_user(user_doc["email"])
+    return str(result.inserted_id)
+
+
+def password_busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
 
 @router.post("/signup")
 async def signup(user: UserCreate):
@@ -30,7 +71,10 @@ async def signup(user: UserCreate):
     if existing:
         raise HTTPException(status_code=400, detail="Email already exists")
 
-    hashed = hash_password(user.password)
+    try:
+        hashed = await hash_password_async(user.password)
+    except PasswordHashBusy:
+        raise password_busy_error()
     user_doc = {
         "email": user.email,
         "full_name": user.full_name,
@@ -38,7 +82,12 @@ async def signup(user: UserCreate):
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
-    result = await users_collection.insert_one(user_doc)
+    try:
+        result = await users_collection.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Concurrent signup with the same email on another worker
+        raise HTTPException(status_code=400, detail="Email already exists")
+    await invalidate_cached_user(user.email)
     return {"message": "User created successfully",
             "user_id": str(result.inserted_id)}
 
@@ -46,8 +95,14 @@ async def signup(user: UserCreate):
 @router.post("/login", response_model=Token)
 async def login(user: UserCreate):
     db_user = await users_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password,
-                                          db_user.get("hashed_password", "")):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        valid = await verify_password_async(
+            user.password, db_user.get("hashed_password", ""))
+    except PasswordHashBusy:
+        raise password_busy_error()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_access_token(
@@ -77,8 +132,6 @@ async def google_login():
 
 @router.get("/google/callback")
 async def google_callback(request: Request, code: str):
-    import requests as pyrequests
-
     if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET or not GOOGLE_REDIRECT_URI:
         raise HTTPException(
             status_code=500,
@@ -94,7 +147,7 @@ async def google_callback(request: Request, code: str):
         "redirect_uri": GOOGLE_REDIRECT_URI,
         "grant_type": "authorization_code",
     }
-    token_res = pyrequests.post(token_url, data=token_data)
+    token_res = await get_http_client().post(token_url, data=token_data)
     if token_res.status_code != 200:
         raise HTTPException(status_code=400,
                             detail="Failed to fetch token from Google")
@@ -102,7 +155,9 @@ async def google_callback(request: Request, code: str):
     tokens = token_res.json()
 
     try:
-        id_info = id_token.verify_oauth2_token(
+        # google-auth fetches signing certs with a blocking HTTP call
+        id_info = await run_blocking(
+            id_token.verify_oauth2_token,
             tokens["id_token"],
             google_requests.Request(),
             GOOGLE_CLIENT_ID
@@ -129,8 +184,7 @@ async def google_callback(request: Request, code: str):
             "updated_at": datetime.utcnow(),
             "auth_provider": "google"
         }
-        result = await users_collection.insert_one(user_doc)
-        user_id = str(result.inserted_id)
+        user_id = await insert_oauth_user(user_doc)
     else:
         user_id = str(user["_id"])
 
@@ -162,7 +216,8 @@ async def google_auth(payload: dict):
             status_code=400, detail="idToken and email required")
 
     try:
-        id_info = id_token.verify_oauth2_token(
+        id_info = await run_blocking(
+            id_token.verify_oauth2_token,
             id_token_str, google_requests.Request(), GOOGLE_CLIENT_ID)
         if id_info.get("email") != email:
             raise HTTPException(
@@ -182,8 +237,7 @@ async def google_auth(payload: dict):
             "auth_provider": provider or "google",
             "provider_id": provider_id,
         }
-        result = await users_collection.insert_one(user_doc)
-        user_id = str(result.inserted_id)
+        user_id = await insert_oauth_user(user_doc)
     else:
         user_id = str(user["_id"])
         name = user.get("full_name", name)
@@ -211,6 +265,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserDB:
                 detail="Invalid authentication credentials"
             )
 
+        cached = await user_cache.get(email)
+        if cached is not None:
+            return UserDB(**cached)
+
         user = await users_collection.find_one({"email": email})
         if not user:
             raise HTTPException(
@@ -218,13 +276,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserDB:
                 detail="User not found"
             )
 
-        return UserDB(
-            id=str(user.get("_id")),
-            username=user.get("username") or user.get(
+        user_fields = {
+            "id": str(user.get("_id")),
+            "username": user.get("username") or user.get(
                 "email") or user.get("full_name"),
-            full_name=user.get("full_name"),
-            email=user.get("email"),
-        )
+            "full_name": user.get("full_name"),
+        }
+        await user_cache.set(email, user_fields)
+        return UserDB(**user_fields)
 
     except jwt.ExpiredSignatureError:
         raise HTTPException(
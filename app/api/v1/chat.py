@@ -1,28 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.chat_utils import get_bot_response
+from app.chat_stream import start_turn, stream_turn
+from app.db.messages import migrate_legacy_messages, page_messages
+from app.db.sessions import get_session_owner, list_sessions
 from app.api.v1.auth import get_current_user
-from app.api.v1.schemas import UserDB, ChatRequest, ChatResponse
+from app.api.v1.limits import Quota, chat_limit
+from app.api.v1.pagination import decode_cursor, encode_cursor
+from app.api.v1.schemas import (
+    UserDB, ChatRequest, ChatResponse, SessionPage, SessionSummary,
+    MessagePage)
 import uuid
 
 router = APIRouter()
 
 
-@router.post("/send", response_model=ChatResponse)
+async def _check_owner(session_id: str, current_user: UserDB) -> dict | None:
+    """
+    The session, or None if it doesn't exist yet; 404 when it belongs
+    to another user
+    """
+    session = await get_session_owner(session_id)
+    if session and session.get("user_id") != current_user.id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@router.post("/send", response_model=ChatResponse,
+             dependencies=[Depends(chat_limit)])
 async def send_message(chat_request: ChatRequest,
                        current_user: UserDB = Depends(get_current_user)):
-    try:
-        user_id = current_user.id
-        session_id = chat_request.session_id
-
-        if not session_id:
-            session_id = str(uuid.uuid4())
+    session_id = chat_request.session_id
+    if session_id:
+        await _check_owner(session_id, current_user)
+    else:
+        session_id = str(uuid.uuid4())
 
+    try:
         bot_reply = await get_bot_response(
-            user_id=user_id,
+            user_id=current_user.id,
             session_id=session_id,
             user_input=chat_request.user_input
         )
-        print(bot_reply, "jj")
 
         return ChatResponse(
             session_id=session_id,
@@ -32,3 +54,105 @@ async def send_message(chat_request: ChatRequest,
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error processing message: {str(e)}")
+
+
+@router.post("/send/stream")
+async def send_message_stream(chat_request: ChatRequest,
+                              current_user: UserDB = Depends(get_current_user),
+                              quota: Quota = Depends(chat_limit)):
+    """
+    Same as /send but streams the reply as Server-Sent Events
+    """
+    session_id = chat_request.session_id
+    if session_id:
+        await _check_owner(session_id, current_user)
+    else:
+        session_id = str(uuid.uuid4())
+
+    task, handler = start_turn(
+        user_id=current_user.id,
+        session_id=session_id,
+        user_input=chat_request.user_input
+    )
+    # The turn runs on after a disconnect, and holds its slot until done
+    quota.hold_until(task)
+
+    return StreamingResponse(
+        stream_turn(task, handler, session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                 **quota.headers}
+    )
+
+
+@router.get("/sessions", response_model=SessionPage)
+async def get_sessions(limit: int = Query(20, ge=1, le=100),
+                       cursor: str | None = None,
+                       current_user: UserDB = Depends(get_current_user)):
+    """
+    The user's sessions, most recently updated first. Pass next_cursor
+    back as cursor for the next page.
+    """
+    after = None
+    if cursor:
+        key = decode_cursor(cursor)
+        try:
+            updated_at = key["updated_at"]
+            after = (updated_at and datetime.fromisoformat(updated_at),
+                     ObjectId(key["id"]))
+        except (KeyError, TypeError, ValueError, InvalidId):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    sessions = await list_sessions(current_user.id, limit + 1, after)
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        last = sessions[-1]
+        updated_at = last.get("updated_at")
+        next_cursor = encode_cursor({
+            "updated_at": updated_at and updated_at.isoformat(),
+            "id": str(last["_id"])})
+
+    return SessionPage(
+        sessions=[SessionSummary(
+            session_id=doc["session_id"],
+            updated_at=doc.get("updated_at"),
+            message_count=doc.get("message_count", 0),
+            documents=[d["filename"] for d in doc.get("documents", [])]
+        ) for doc in sessions],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/sessions/{session_id}/messages", response_model=MessagePage)
+async def get_session_messages(
+        session_id: str,
+        limit: int = Query(50, ge=1, le=200),
+        cursor: str | None = None,
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+        current_user: UserDB = Depends(get_current_user)):
+    """
+    A page of a session's transcript, newest first by default (order=asc
+    for oldest first). Pass next_cursor back as cursor, with the same
+    order, for the next page.
+    """
+    session = await _check_owner(session_id, current_user)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    await migrate_legacy_messages(session)
+
+    after_seq = None
+    if cursor:
+        after_seq = decode_cursor(cursor).get("seq")
+        if not isinstance(after_seq, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    messages = await page_messages(
+        session_id, limit + 1, order == "desc", after_seq)
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor({"seq": messages[-1]["seq"]})
+
+    return MessagePage(session_id=session_id, messages=messages,
+                       next_cursor=next_cursor)
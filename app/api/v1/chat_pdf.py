@@ -1,47 +1,113 @@
-from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import (
+    APIRouter, Depends, UploadFile, File, HTTPException, status)
+from app.api.v1.auth import get_current_user
+from app.api.v1.limits import upload_limit
+from app.api.v1.schemas import UserDB
 from app.db.mongo import sessions_collection
-import PyPDF2
-import io
+from app.jobs import enqueue_job, get_job
+from app.pdf_ingest import delete_document, spool_upload
+from app.pdf_store import drop_upload
 
 router = APIRouter()
 
+
+async def _own_session(session_id: str, current_user: UserDB,
+                       allow_new: bool = False) -> dict | None:
+    """
+    The session if it belongs to the user; 404 for other users' sessions
+    and, unless `allow_new`, for sessions that don't exist yet
+    """
+    session = await sessions_collection.find_one(
+        {"session_id": session_id}, {"user_id": 1, "documents": 1})
+    if session is None and allow_new:
+        return None
+    if not session or session.get("user_id") != current_user.id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
 # this route for uploadinf the pdf files
 
 
-@router.post("/sessions/{session_id}/upload-pdf")
-async def upload_pdf(session_id: str, file: UploadFile = File(...)):
+@router.post("/sessions/{session_id}/upload-pdf",
+             status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(upload_limit)])
+async def upload_pdf(session_id: str, file: UploadFile = File(...),
+                     current_user: UserDB = Depends(get_current_user)):
     """
-    Upload and extract text from a PDF file for a session
+    Accept a PDF for a session and queue its extraction and indexing.
+    Poll /jobs/{job_id} for the outcome. A session holds any number of
+    documents; uploading one it already has is a no-op.
     """
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(
             status_code=400, detail="Only PDF files are allowed")
+    await _own_session(session_id, current_user, allow_new=True)
 
     try:
-        contents = await file.read()
-        pdf_file = io.BytesIO(contents)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-
-        await sessions_collection.update_one(
-            {"session_id": session_id},
-            {"$set": {
-                "pdf": {
-                    "filename": file.filename,
-                    "content": text,
-                    "uploaded_at": datetime.utcnow()
-                }
-            }},
-            upsert=True
-        )
-
-        return {"message": "PDF uploaded successfully",
-                "pages": len(pdf_reader.pages)}
+        upload = await spool_upload(file)
+        try:
+            job_id = await enqueue_job("pdf_upload", {
+                "session_id": session_id,
+                "user_id": current_user.id,
+                "filename": file.filename,
+                "upload": upload
+            }, user_id=current_user.id)
+        except BaseException:
+            await drop_upload(upload)
+            raise
 
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error processing PDF: {str(e)}")
+
+    return {"message": "PDF accepted for processing",
+            "job_id": job_id, "status": "queued"}
+
+
+@router.get("/jobs/{job_id}")
+async def upload_status(job_id: str,
+                        current_user: UserDB = Depends(get_current_user)):
+    """
+    Status of a PDF processing job: queued, running, done or failed,
+    with page progress and per-stage timings
+    """
+    job = await get_job(job_id)
+    if not job or job.get("user_id") != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "progress": job.get("progress", {}),
+        "stages": job.get("stages", {}),
+        "attempts": job.get("attempts", 0),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at")
+    }
+
+
+@router.get("/sessions/{session_id}/documents")
+async def list_documents(session_id: str,
+                         current_user: UserDB = Depends(get_current_user)):
+    """
+    Documents uploaded to a session
+    """
+    session = await _own_session(session_id, current_user)
+    return {"session_id": session_id,
+            "documents": session.get("documents", [])}
+
+
+@router.delete("/sessions/{session_id}/documents/{content_hash}")
+async def remove_document(session_id: str, content_hash: str,
+                          current_user: UserDB = Depends(get_current_user)):
+    """
+    Remove one document and its vectors from a session
+    """
+    await _own_session(session_id, current_user)
+    if not await delete_document(session_id, content_hash):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"message": "Document removed", "content_hash": content_hash}
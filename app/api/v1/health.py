@@ -1,4 +1,7 @@
 from fastapi import APIRouter
+from app.core.cache import cache_stats
+from app.semantic_cache import semantic_cache
+from app.tools.tool_cache import tool_cache_stats
 
 router = APIRouter()
 
@@ -6,3 +9,19 @@ router = APIRouter()
 @router.get("/health", tags=["Health"])
 async def health_check():
     return {"status": "ok", "message": "M2 chatbot backend is running 🚀"}
+
+
+@router.get("/caches", tags=["Health"])
+async def cache_health():
+    """
+    Hit/miss counters of this worker's caches
+    """
+    return {**cache_stats(), "semantic": semantic_cache.stats()}
+
+
+@router.get("/tools", tags=["Health"])
+async def tool_cache_health():
+    """
+    Tool result cache hit rates and upstream time saved on this worker
+    """
+    return tool_cache_stats()
@@ -0,0 +1,109 @@
+import asyncio
+import math
+from fastapi import Depends, HTTPException, Response, status
+from app.api.v1.auth import get_current_user
+from app.api.v1.schemas import UserDB
+from app.core.config import settings
+from app.core.rate_limit import get_rate_limiter
+
+# Slot releases scheduled by finished turns, kept until they complete
+_releases = set()
+
+
+class Quota:
+    """
+    One admitted request: its RateLimit-* headers and in-flight slot
+    """
+
+    def __init__(self, key: str, lease: str | None, headers: dict):
+        self.key = key
+        self.headers = headers
+        self._lease = lease
+        self._streaming = False
+
+    async def release(self):
+        if self._lease is not None:
+            lease, self._lease = self._lease, None
+            await get_rate_limiter().release(self.key, lease)
+
+    def hold_until(self, task: asyncio.Task):
+        """
+        Keep the slot until `task` finishes, whether or not its client
+        is still there
+        """
+        self._streaming = True
+
+        def release(_):
+            releasing = asyncio.create_task(self.release())
+            _releases.add(releasing)
+            releasing.add_done_callback(_releases.discard)
+
+        task.add_done_callback(release)
+
+
+class RouteLimit:
+    """
+    Dependency limiting each user on a route to `per_minute` requests
+    (bursts of up to `burst`) and `concurrency` at a time. Answers 429
+    with Retry-After when over either limit.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int,
+                 concurrency: int):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.concurrency = concurrency
+
+    def _headers(self, tokens: float) -> dict:
+        return {
+            "RateLimit-Limit": str(self.burst),
+            "RateLimit-Remaining": str(int(tokens)),
+            "RateLimit-Reset": str(
+                math.ceil((self.burst - tokens) / self.rate)),
+            "RateLimit-Policy": (
+                f"{self.burst};w={math.ceil(self.burst / self.rate)}"),
+        }
+
+    async def __call__(self, response: Response,
+                       current_user: UserDB = Depends(get_current_user)):
+        if not settings.RATE_LIMIT_ENABLED:
+            yield Quota("", None, {})
+            return
+
+        limiter = get_rate_limiter()
+        key = f"{self.name}:{current_user.id}"
+        lease = await limiter.acquire(key, self.concurrency)
+        if lease is None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests in progress",
+                headers={"Retry-After": "1"}
+            )
+
+        allowed, tokens = await limiter.take(key, self.rate, self.burst)
+        headers = self._headers(tokens)
+        if not allowed:
+            await limiter.release(key, lease)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={**headers, "Retry-After": str(
+                    math.ceil((1 - tokens) / self.rate))}
+            )
+
+        quota = Quota(key, lease, headers)
+        response.headers.update(headers)
+        try:
+            yield quota
+        finally:
+            if not quota._streaming:
+                await quota.release()
+
+
+chat_limit = RouteLimit(
+    "chat", settings.RATE_LIMIT_CHAT_PER_MINUTE,
+    settings.RATE_LIMIT_CHAT_BURST, settings.CONCURRENCY_LIMIT_CHAT)
+upload_limit = RouteLimit(
+    "upload", settings.RATE_LIMIT_UPLOAD_PER_MINUTE,
+    settings.RATE_LIMIT_UPLOAD_BURST, settings.CONCURRENCY_LIMIT_UPLOAD)
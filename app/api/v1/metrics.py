@@ -0,0 +1,43 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.cache import cache_stats
+from app.core.llm_gateway import scheduler
+from app.core.metrics import render_metrics
+from app.semantic_cache import semantic_cache
+from app.tools.tool_cache import tool_cache_stats
+
+router = APIRouter()
+
+CACHE_METRICS = (("hits", "cache_hits_total", "counter"),
+                 ("misses", "cache_misses_total", "counter"),
+                 ("size", "cache_entries", "gauge"))
+TOOL_METRICS = (("upstream_calls", "tool_upstream_calls_total", "counter"),
+                ("upstream_seconds", "tool_upstream_seconds_total", "counter"),
+                ("coalesced", "tool_coalesced_total", "counter"),
+                ("hit_rate", "tool_cache_hit_rate", "gauge"))
+GATEWAY_METRICS = (("active", "llm_gateway_active", "gauge"),
+                   ("waiting", "llm_gateway_waiting", "gauge"),
+                   ("limit", "llm_gateway_concurrency_limit", "gauge"))
+
+
+def stats_lines(stats: dict, label: str, metrics: tuple) -> list[str]:
+    lines = []
+    for key, name, kind in metrics:
+        lines.append(f"# TYPE {name} {kind}")
+        for owner, values in stats.items():
+            if key in values:
+                lines.append(f'{name}{{{label}="{owner}"}} {values[key]:g}')
+    return lines
+
+
+@router.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    """
+    This worker's metrics in the Prometheus text format
+    """
+    caches = {**cache_stats(), "semantic": semantic_cache.stats()}
+    lines = (stats_lines(caches, "cache", CACHE_METRICS) +
+             stats_lines(tool_cache_stats(), "tool", TOOL_METRICS) +
+             stats_lines({"openai": scheduler.stats()}, "upstream",
+                         GATEWAY_METRICS))
+    return render_metrics() + "\n".join(lines) + "\n"
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional
 import uuid
@@ -28,3 +29,28 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     session_id: str
     response: str
+
+
+class SessionSummary(BaseModel):
+    session_id: str
+    updated_at: Optional[datetime] = None
+    message_count: int = 0
+    documents: list[str] = []
+
+
+class SessionPage(BaseModel):
+    sessions: list[SessionSummary]
+    next_cursor: Optional[str] = None
+
+
+class MessageOut(BaseModel):
+    seq: int
+    type: str
+    content: str
+    created_at: Optional[datetime] = None
+
+
+class MessagePage(BaseModel):
+    session_id: str
+    messages: list[MessageOut]
+    next_cursor: Optional[str] = None
@@ -1,8 +1,11 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
+import asyncio
 import os
 from dotenv import load_dotenv
+from app.core.config import settings
+from app.core.executor import password_executor
 
 load_dotenv()
 
@@ -26,6 +29,42 @@ def verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
 
 
+class PasswordHashBusy(Exception):
+    """
+    Raised when too many hash/verify calls are already admitted
+    """
+
+
+_pending_password_tasks = 0
+
+
+async def _run_password_task(func, *args):
+    global _pending_password_tasks
+    if _pending_password_tasks >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashBusy()
+
+    _pending_password_tasks += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _pending_password_tasks -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    hash_password on the password pool, off the event loop
+    """
+    return await _run_password_task(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """
+    verify_password on the password pool, off the event loop
+    """
+    return await _run_password_task(verify_password, password, hashed)
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """
     Create a JWT token
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
+from app.core.config import settings
+from app.core.llm_gateway import background_priority
+from app.core.tokens import count_tokens
+from app.db.mongo import sessions_collection
+from app.db.messages import (
+    load_messages, load_recent_messages, load_message_range)
+
+logger = logging.getLogger(__name__)
+
+# Context get_bot_response adds on every turn; older transcripts stored
+# these alongside the real conversation
+INJECTED_PREFIXES = (
+    "Remember this user information:",
+    "User has uploaded a PDF document available for questioning.",
+)
+
+# Keeps fire-and-forget summary updates alive until they finish
+_summary_tasks = set()
+
+
+def is_injected(msg: dict) -> bool:
+    return msg["type"] == "ai" and msg["content"].startswith(
+        INJECTED_PREFIXES)
+
+
+def to_message(msg: dict):
+    if msg["type"] == "human":
+        return HumanMessage(content=msg["content"])
+    return AIMessage(content=msg["content"])
+
+
+async def load_history(session_id: str, session: dict) -> list:
+    """
+    Messages to seed the agent memory with. In summary mode this is the
+    rolling summary plus the most recent turns that fit MEMORY_MAX_TOKENS.
+    """
+    if settings.MEMORY_MODE != "summary":
+        return [to_message(msg) for msg in await load_messages(session_id)
+                if not is_injected(msg)]
+
+    recent = await load_recent_messages(
+        session_id,
+        session.get("summary_seq", 0),
+        settings.MEMORY_RECENT_TURNS * 2 + settings.MEMORY_SUMMARY_BATCH
+    )
+
+    history = []
+    budget = settings.MEMORY_MAX_TOKENS
+    for msg in recent:
+        if is_injected(msg):
+            continue
+        budget -= count_tokens(msg["content"])
+        if budget < 0:
+            break
+        history.append(to_message(msg))
+    history.reverse()
+
+    if session.get("summary"):
+        history.insert(0, SystemMessage(
+            content=f"Summary of the earlier conversation: {session['summary']}"))
+    return history
+
+
+def schedule_summary_update(session_id: str, session: dict | None,
+                            message_count: int, llm):
+    """
+    Fold turns that left the verbatim window into the session summary,
+    in the background so the reply is not delayed
+    """
+    if settings.MEMORY_MODE != "summary":
+        return
+
+    summary_seq = (session or {}).get("summary_seq", 0)
+    window_start = message_count - settings.MEMORY_RECENT_TURNS * 2
+    if window_start - summary_seq < settings.MEMORY_SUMMARY_BATCH:
+        return
+
+    task = asyncio.create_task(_update_summary(
+        session_id, (session or {}).get("summary", ""),
+        summary_seq, window_start, llm))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+
+
+async def drain_summary_updates(timeout: float) -> int:
+    """
+    Wait up to `timeout` seconds for background summary updates. Returns
+    how many were left unfinished.
+    """
+    if not _summary_tasks:
+        return 0
+    _, pending = await asyncio.wait(set(_summary_tasks), timeout=timeout)
+    return len(pending)
+
+
+async def _update_summary(session_id: str, summary: str, summary_seq: int,
+                          window_start: int, llm):
+    try:
+        older = await load_message_range(session_id, summary_seq, window_start)
+        new_lines = "\n".join(
+            f"{'Human' if msg['type'] == 'human' else 'AI'}: {msg['content']}"
+            for msg in older if not is_injected(msg)
+        )
+        if new_lines:
+            with background_priority():
+                result = await llm.ainvoke(SUMMARY_PROMPT.format(
+                    summary=summary, new_lines=new_lines))
+            summary = result.content
+
+        # Skip if a concurrent update already summarized further
+        await sessions_collection.update_one(
+            {"session_id": session_id,
+             "summary_seq": {"$not": {"$gte": window_start}}},
+            {"$set": {"summary": summary, "summary_seq": window_start}}
+        )
+    except Exception:
+        logger.exception("Failed to update summary for %s", session_id)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+from langchain_core.callbacks import AsyncCallbackHandler
+from app.chat_utils import get_bot_response, AGENT_TAG
+
+# The conversational ReAct agent writes "AI: <answer>" after its reasoning
+AGENT_ANSWER_PREFIX = "AI:"
+
+# Turns whose client went away keep running so the transcript is saved
+_background_tasks = set()
+
+
+async def drain_background_turns(timeout: float) -> int:
+    """
+    Wait up to `timeout` seconds for turns still running after their
+    client went away. Returns how many were left unfinished.
+    """
+    if not _background_tasks:
+        return 0
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    return len(pending)
+
+
+def format_sse(event: str, data: dict) -> str:
+    """
+    Encode one Server-Sent Event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SSECallbackHandler(AsyncCallbackHandler):
+    """
+    Collects LLM tokens and tool calls of one chat turn into a queue.
+    Agent LLM output is held back until the answer prefix so the
+    Thought/Action scaffolding never reaches the client.
+    """
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self._buffers = {}
+        self._answering = set()
+        self._tool_names = {}
+
+    async def on_llm_new_token(self, token, *, run_id, tags=None, **kwargs):
+        if not token:
+            return
+        if AGENT_TAG not in (tags or []) or run_id in self._answering:
+            self.queue.put_nowait(("token", {"token": token}))
+            return
+
+        buffer = self._buffers.get(run_id, "") + token
+        if AGENT_ANSWER_PREFIX not in buffer:
+            self._buffers[run_id] = buffer
+            return
+
+        # Drop whitespace between the prefix and the first answer token
+        answer = buffer.split(AGENT_ANSWER_PREFIX, 1)[1].lstrip()
+        if answer:
+            self._buffers.pop(run_id, None)
+            self._answering.add(run_id)
+            self.queue.put_nowait(("token", {"token": answer}))
+        else:
+            self._buffers[run_id] = buffer
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name", "tool")
+        self._tool_names[run_id] = name
+        self.queue.put_nowait(
+            ("tool_start", {"tool": name, "input": input_str}))
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        name = self._tool_names.pop(run_id, "tool")
+        self.queue.put_nowait(
+            ("tool_end", {"tool": name, "output": str(output)}))
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        name = self._tool_names.pop(run_id, "tool")
+        self.queue.put_nowait(
+            ("tool_error", {"tool": name, "error": str(error)}))
+
+
+def start_turn(user_id: str, session_id: str,
+               user_input: str) -> tuple[asyncio.Task, SSECallbackHandler]:
+    """
+    Start one chat turn in the background. Returns its task, which keeps
+    running when the client goes away, and the handler collecting its
+    events for stream_turn.
+    """
+    handler = SSECallbackHandler()
+    task = asyncio.create_task(get_bot_response(
+        user_id=user_id,
+        session_id=session_id,
+        user_input=user_input,
+        callbacks=[handler]
+    ))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(lambda _: handler.queue.put_nowait(None))
+    return task, handler
+
+
+async def stream_turn(task: asyncio.Task, handler: SSECallbackHandler,
+                      session_id: str):
+    """
+    Yield SSE frames of a started turn: token, tool_start, tool_end and
+    tool_error while it runs, then a final done (or error) frame
+    carrying the full response. The turn is persisted before done is sent.
+    """
+    while True:
+        item = await handler.queue.get()
+        if item is None:
+            break
+        yield format_sse(*item)
+
+    try:
+        bot_reply = task.result()
+    except Exception as e:
+        yield format_sse("error", {
+            "detail": f"Error processing message: {str(e)}"})
+        return
+
+    yield format_sse("done", {"session_id": session_id,
+                              "response": bot_reply})
+
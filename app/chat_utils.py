@@ -1,52 +1,50 @@
-import os
-from datetime import datetime
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage
-from langchain.agents import initialize_agent, AgentType
+import logging
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
+from app.chat_memory import load_history, schedule_summary_update
 from app.db.mongo import sessions_collection
-
-# All tools available
-from app.tools.research_tool import research_papers
-from app.tools.web_search_tool import web_search
+from app.db.messages import append_messages, migrate_legacy_messages
+from app.core.config import settings
+from app.core.metrics import span
+from app.intent_router import CHAT, PDF, intent_router
+from app.llm_factory import (
+    DIRECT_CHAT_SYSTEM_PROMPT, build_agent_executor, get_chat_model,
+    new_memory)
+from app.pdf_index import content_hash
+from app.pdf_ingest import document_hashes, migrate_legacy_pdf
+from app.semantic_cache import is_context_free, semantic_cache
 from app.tools.pdf_tool import PDFQATool
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-# Initialize Chat LLM Openai
-chat_model = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0.7,
-    api_key=OPENAI_API_KEY
-)
+logger = logging.getLogger(__name__)
 
-tools = [research_papers, web_search]
+# Tags ReAct agent runs so stream handlers can hold back its scaffolding
+AGENT_TAG = "chat_agent"
 
 
-async def get_bot_response(user_id: str, session_id: str, user_input: str):
+async def get_bot_response(user_id: str, session_id: str, user_input: str,
+                           callbacks: list | None = None):
     """
     Main function to get chatbot response.
-    Integrates PDF QA, research papers, web search, and conversation memory.
+    Routes the turn to a direct chat reply, PDF QA, or the agent with
+    research papers and web search, with conversation memory.
+    Optional LangChain callbacks receive tokens and tool events as they
+    are produced.
     """
     # Initialize  memory
-    memory = ConversationBufferMemory(
-        memory_key="chat_history", return_messages=True
-    )
-
-    session = await sessions_collection.find_one({"session_id": session_id})
+    memory = new_memory()
+
+    with span("session_load"):
+        session = await sessions_collection.find_one(
+            {"session_id": session_id})
+        if session:
+            await migrate_legacy_messages(session)
+            await migrate_legacy_pdf(session)
     user_facts = ""
-    pdf_content = None
+    documents = []
 
     if session:
-        restored_messages = []
-        for msg in session.get("messages", []):
-            if msg["type"] == "human":
-                restored_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["type"] == "ai":
-                restored_messages.append(AIMessage(content=msg["content"]))
-        memory.chat_memory.messages = restored_messages
+        with span("memory_rebuild"):
+            memory.chat_memory.messages = await load_history(
+                session_id, session)
 
         user_facts = session.get("user_facts", "")
         if user_facts:
@@ -55,72 +53,102 @@ async def get_bot_response(user_id: str, session_id: str, user_input: str):
                     content=f"Remember this user information: {user_facts}")
             )
 
-        if session.get("pdf") and session["pdf"].get("content"):
-            pdf_content = session["pdf"]["content"]
+        documents = session.get("documents", [])
+        if documents:
+            names = ", ".join(d["filename"] for d in documents)
             memory.chat_memory.add_message(
                 AIMessage(
-                    content="User has uploaded a PDF document available for questioning.")
+                    content=f"User has uploaded PDF documents available for questioning: {names}")
             )
 
     if "my name is" in user_input.lower():
         name = user_input.split("is")[-1].strip()
         user_facts = f"My name is {name}"
 
-    # Check if this is a PDF-related question
-    is_pdf_question = (
-        pdf_content and
-        (
-            "pdf" in user_input.lower() or
-            "document" in user_input.lower() or
-            "resume" in user_input.lower() or
-            "cv" in user_input.lower() or
-            "upload" in user_input.lower() or
-            any(word in user_input.lower() for word in ['my', 'me', 'i']) and
-            any(word in user_input.lower()
-                for word in ['skill', 'experience', 'education', 'work', 'job'])
-        )
-    )
+    with span("route"):
+        intent, _ = await intent_router.route(
+            user_input, [d["filename"] for d in documents])
+
+    # Semantic cache scope: PDF answers are shared per document, other
+    # answers only for inputs that don't depend on the conversation
+    cache_scope = None
+    if settings.SEMANTIC_CACHE_ENABLED:
+        if intent == PDF:
+            # The set of documents the answer was drawn from
+            cache_scope = content_hash(
+                ",".join(sorted(document_hashes(session))))
+        elif is_context_free(user_input):
+            cache_scope = "chat"
+
+    # Everything the memory holds past this point is new in this turn
+    stored_count = len(memory.chat_memory.messages)
+
+    cached_text = None
+    if cache_scope:
+        # The cache is optional: without an embedding, answer as usual
+        try:
+            with span("semantic_cache"):
+                query_vector = await semantic_cache.embed(user_input)
+                cached_text = semantic_cache.lookup(cache_scope, query_vector)
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+            cache_scope = None
 
     try:
-        if is_pdf_question:
+        # Only real answers are cached, never errors or missing content
+        answered = True
+
+        if cached_text is not None:
+            result_text = cached_text
+            if intent != PDF:
+                memory.save_context({"input": user_input},
+                                    {"output": result_text})
+        elif intent == PDF:
             pdf_tool = PDFQATool(session_id)
-            result_text = await pdf_tool.run(user_input)
+            with span("pdf_qa"):
+                result_text = await pdf_tool.run(
+                    user_input, callbacks=callbacks)
+            answered = pdf_tool.answered
             result_text = f"Based on your uploaded document:\n{result_text}"
+        elif intent == CHAT:
+            # No tools needed: one model call without the agent's prompt
+            with span("direct_chat"):
+                reply = await get_chat_model().ainvoke(
+                    [SystemMessage(content=DIRECT_CHAT_SYSTEM_PROMPT),
+                     *memory.chat_memory.messages,
+                     HumanMessage(content=user_input)],
+                    config={"callbacks": callbacks}
+                )
+            result_text = reply.content
+            memory.save_context({"input": user_input},
+                                {"output": result_text})
         else:
-            agent_executor = initialize_agent(
-                tools=tools,
-                llm=chat_model,
-                agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
-                memory=memory,
-                verbose=False,
-                handle_parsing_errors=True
-            )
-            result_text = agent_executor.run(user_input)
+            agent_executor = build_agent_executor(memory)
+            tags = [AGENT_TAG] if settings.AGENT_MODE == "react" else []
+            with span("agent_run"):
+                result = await agent_executor.ainvoke(
+                    {"input": user_input},
+                    config={"callbacks": callbacks, "tags": tags}
+                )
+            result_text = result["output"]
+
+        if cache_scope and cached_text is None and answered:
+            semantic_cache.store(cache_scope, query_vector, result_text)
 
     except Exception as e:
         result_text = f"I encountered an error while processing your request: {str(e)}. Please try again."
 
-    messages_to_save = []
-    for msg in memory.chat_memory.messages:
+    new_messages = []
+    for msg in memory.chat_memory.messages[stored_count:]:
         if isinstance(msg, HumanMessage):
-            messages_to_save.append({"type": "human", "content": msg.content})
+            new_messages.append({"type": "human", "content": msg.content})
         elif isinstance(msg, AIMessage):
-            messages_to_save.append({"type": "ai", "content": msg.content})
-
-    update_data = {
-        "user_id": user_id,
-        "messages": messages_to_save,
-        "user_facts": user_facts,
-        "updated_at": datetime.utcnow()
-    }
-
-    if session and session.get("pdf"):
-        update_data["pdf"] = session["pdf"]
-
-    await sessions_collection.update_one(
-        {"session_id": session_id},
-        {"$set": update_data},
-        upsert=True
-    )
+            new_messages.append({"type": "ai", "content": msg.content})
+
+    with span("mongo_write"):
+        message_count = await append_messages(
+            session_id, user_id, new_messages, {"user_facts": user_facts})
+    schedule_summary_update(
+        session_id, session, message_count, get_chat_model())
 
     return result_text
@@ -0,0 +1,174 @@
+import asyncio
+import re
+from langchain.docstore.document import Document
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import Histogram
+from app.core.tokens import count_tokens
+from app.llm_factory import get_map_chain
+from app.pdf_index import CHUNK_OVERLAP, SessionIndex
+from app.retrieval import hybrid_search
+
+# Rounds of mapping notes again while they exceed the budget
+MAX_COLLAPSE_ROUNDS = 3
+
+pdf_qa_tokens = Histogram(
+    "pdf_qa_tokens", "Tokens per PDF answer: packed context, and model "
+    "input and output over all calls of the answer", ("kind",),
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000))
+
+# Questions about a document as a whole rather than a detail in it
+_DOCUMENT_WIDE = re.compile(
+    r"\b(summari[sz]e|summary|overview|outline|gist|tl;?dr|"
+    r"main (points|ideas|themes|takeaways)|"
+    r"key (points|takeaways|findings)|"
+    r"(whole|entire|full) (document|pdf|file|resume|cv|report))\b",
+    re.IGNORECASE
+)
+
+
+def is_document_wide(question: str) -> bool:
+    return _DOCUMENT_WIDE.search(question) is not None
+
+
+def _trim_overlap(previous: str, text: str) -> str:
+    # The splitter starts a chunk with up to CHUNK_OVERLAP characters
+    # from the end of the one before, cut at word boundaries
+    for size in range(min(CHUNK_OVERLAP, len(previous), len(text)), 0, -1):
+        at_word_end = size == len(text) or text[size].isspace()
+        at_word_start = size == len(previous) or previous[-size - 1].isspace()
+        if at_word_end and at_word_start and previous.endswith(text[:size]):
+            return text[size:].lstrip()
+    return text
+
+
+def merge_neighbours(docs: list[Document], order: dict) -> list[Document]:
+    """
+    Chunks in document order, each run of consecutive chunks of one
+    document joined into a single passage without the text they share.
+    Chunks of unknown position follow, as given.
+    """
+    placed = sorted((doc for doc in docs if doc.id in order),
+                    key=lambda doc: order[doc.id])
+    passages, last = [], None
+    for doc in placed:
+        position = order[doc.id]
+        if last is not None and position == (last[0], last[1] + 1):
+            previous = passages[-1]
+            text = _trim_overlap(previous.page_content, doc.page_content)
+            passages[-1] = Document(
+                page_content=f"{previous.page_content}\n{text}",
+                metadata=previous.metadata)
+        else:
+            passages.append(doc)
+        last = position
+    return passages + [doc for doc in docs if doc.id not in order]
+
+
+def pack_context(ranked: list[Document], order: dict,
+                 budget: int) -> tuple[list[Document], int]:
+    """
+    The best-ranked chunks that fit in `budget` tokens, duplicates left
+    out, as passages in document order. Returns them and their tokens.
+    """
+    picked, seen, used = [], set(), 0
+    for doc in ranked:
+        text = " ".join(doc.page_content.split())
+        if not text or text in seen:
+            continue
+        tokens = count_tokens(doc.page_content)
+        if used + tokens > budget:
+            continue  # a smaller chunk further down may still fit
+        seen.add(text)
+        picked.append(doc)
+        used += tokens
+    passages = merge_neighbours(picked, order)
+    return passages, sum(count_tokens(p.page_content) for p in passages)
+
+
+def _total_tokens(docs: list[Document]) -> int:
+    return sum(count_tokens(doc.page_content) for doc in docs)
+
+
+def group_chunks(docs: list[Document], budget: int) -> list[list[Document]]:
+    """
+    Consecutive runs of chunks of up to `budget` tokens each
+    """
+    groups, group, used = [], [], 0
+    for doc in docs:
+        tokens = count_tokens(doc.page_content)
+        if group and used + tokens > budget:
+            groups.append(group)
+            group, used = [], 0
+        group.append(doc)
+        used += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+
+async def _map(question: str, groups: list[list[Document]], order: dict,
+               concurrency: int, callbacks: list) -> list[Document]:
+    # Every group is mapped, `concurrency` model calls at a time
+    chain = get_map_chain()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def map_group(group):
+        async with semaphore:
+            return await chain.ainvoke(
+                {"question": question,
+                 "context": "\n\n".join(
+                     p.page_content for p in merge_neighbours(group, order))},
+                config={"callbacks": callbacks})
+
+    notes = await asyncio.gather(*(map_group(group) for group in groups))
+    return [Document(page_content=note.strip()) for note in notes
+            if note.strip() and note.strip().upper() != "NONE"]
+
+
+async def map_reduce_context(question: str, chunks: list[Document],
+                             order: dict, budget: int, concurrency: int,
+                             callbacks: list) -> list[Document]:
+    """
+    Notes on `question` taken from every group of chunks, mapped again
+    while they exceed `budget`
+    """
+    groups = await run_blocking(group_chunks, chunks, budget)
+    notes = await _map(question, groups, order, concurrency, callbacks)
+
+    for _ in range(MAX_COLLAPSE_ROUNDS):
+        groups = await run_blocking(group_chunks, notes, budget)
+        if len(groups) <= 1:
+            break
+        notes = await _map(question, groups, {}, concurrency, callbacks)
+    return notes
+
+
+async def prepare_context(session_index: SessionIndex, question: str,
+                          map_callbacks: list) -> tuple[list[Document],
+                                                        int, str]:
+    """
+    Passages to answer `question` from, their tokens, and how they were
+    made: "packed" from the best retrieved chunks within
+    CONTEXT_TOKEN_BUDGET, or "map_reduce" notes over every chunk for a
+    question about whole documents larger than that
+    """
+    budget = settings.CONTEXT_TOKEN_BUDGET
+    order = session_index.chunk_order()
+
+    if is_document_wide(question):
+        chunks = session_index.chunks()
+        if await run_blocking(_total_tokens, chunks) <= budget:
+            passages, tokens = await run_blocking(
+                pack_context, chunks, order, budget)
+            return passages, tokens, "packed"
+        notes = await map_reduce_context(
+            question, chunks, order, budget,
+            settings.CONTEXT_MAP_CONCURRENCY, map_callbacks)
+        passages, tokens = await run_blocking(pack_context, notes, {}, budget)
+        return passages, tokens, "map_reduce"
+
+    ranked = await hybrid_search(session_index, question,
+                                 k=settings.CONTEXT_CANDIDATES)
+    passages, tokens = await run_blocking(pack_context, ranked, order, budget)
+    return passages, tokens, "packed"
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+from cachetools import LRUCache
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional, only needed for CACHE_BACKEND=redis
+    aioredis = None
+
+# Every cache created through get_cache, by name, for stats reporting
+_caches = {}
+
+
+class MemoryCache:
+    """
+    Size-bounded LRU with per-entry expiry, local to this process
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = LRUCache(maxsize=maxsize)
+
+    async def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._data.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    async def get_many(self, keys: list[str]) -> list:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        self._data[key] = (expires_at, value)
+
+    async def set_many(self, items: dict, ttl: float | None = None):
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def clear(self):
+        self._data.clear()
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "hits": self.hits,
+                "misses": self.misses, "size": len(self._data)}
+
+
+class RedisCache:
+    """
+    Cache shared by all workers through any Redis-protocol server.
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, name: str, url: str, ttl: float):
+        if aioredis is None:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' package")
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._prefix = f"cache:{name}:"
+        self._redis = aioredis.from_url(url)
+
+    async def get(self, key: str):
+        raw = await self._redis.get(self._prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def get_many(self, keys: list[str]) -> list:
+        """
+        Values of `keys` in one round trip, None for the missing ones
+        """
+        if not keys:
+            return []
+        raws = await self._redis.mget([self._prefix + key for key in keys])
+        hits = sum(raw is not None for raw in raws)
+        self.hits += hits
+        self.misses += len(raws) - hits
+        return [None if raw is None else json.loads(raw) for raw in raws]
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        ttl = ttl if ttl is not None else self.ttl
+        await self._redis.set(self._prefix + key, json.dumps(value),
+                              px=max(1, int(ttl * 1000)))
+
+    async def set_many(self, items: dict, ttl: float | None = None):
+        """
+        Store all of `items` in one pipelined round trip
+        """
+        if not items:
+            return
+        px = max(1, int((ttl if ttl is not None else self.ttl) * 1000))
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self._prefix + key, json.dumps(value), px=px)
+            await pipe.execute()
+
+    async def delete(self, key: str):
+        await self._redis.delete(self._prefix + key)
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match=self._prefix + "*"):
+            await self._redis.delete(key)
+
+    async def close(self):
+        await self._redis.aclose()
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits,
+                "misses": self.misses}
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one; the others
+    await the first call's result (or exception). The call runs in a
+    task of its own, so a caller that times out or is cancelled stops
+    waiting without cancelling it for the rest.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key: str, func):
+        """
+        Await func() once per key at a time. Returns (result, shared),
+        where shared is True for callers that joined an in-flight call.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+
+        task = asyncio.create_task(func())
+        self._calls[key] = task
+        # Nobody may be waiting; don't warn about an unretrieved error
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task), False
+
+
+def get_cache(name: str, maxsize: int, ttl: float):
+    """
+    Named cache on the configured backend (CACHE_BACKEND)
+    """
+    if name not in _caches:
+        if settings.CACHE_BACKEND == "redis":
+            _caches[name] = RedisCache(name, settings.REDIS_URL, ttl)
+        else:
+            _caches[name] = MemoryCache(name, maxsize, ttl)
+    return _caches[name]
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+async def close_caches():
+    """
+    Release backend connections of every cache
+    """
+    for cache in _caches.values():
+        await cache.close()
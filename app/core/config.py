@@ -15,6 +15,167 @@ class Settings(BaseSettings):
 
     MONGO_URI: str
     MONGO_DB: str
+    # Connection pool of each worker process
+    MONGO_MAX_POOL_SIZE: int = 50
+    MONGO_MIN_POOL_SIZE: int = 5
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+
+    # Production server (python -m app.main / gunicorn.conf.py): worker
+    # processes, and how long shutdown waits for in-flight chat turns
+    WORKERS: int = 1
+    GRACEFUL_SHUTDOWN_SECONDS: float = 30.0
+
+    # Number of deserialized PDF vector indexes kept hot in memory
+    PDF_INDEX_CACHE_SIZE: int = 32
+
+    # Outbound HTTP pool shared by the agent tools
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    # Keep-alive pool shared by every OpenAI client in the process,
+    # HTTP/2 when the 'h2' package is installed
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_HTTP2: bool = True
+    # Texts per OpenAI embeddings request
+    OPENAI_EMBEDDING_BATCH_SIZE: int = 1000
+
+    # LLM gateway in front of every OpenAI request of a worker: at most
+    # LLM_MAX_CONCURRENCY in flight and LLM_TOKENS_PER_MINUTE estimated
+    # tokens (0 for no budget; divide the account's limit among workers).
+    # Chat turns go before background work (PDF jobs, summaries). A 429
+    # halves the concurrency and pauses for Retry-After, or a backoff of
+    # up to LLM_BACKOFF_MAX_SECONDS
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_TOKENS_PER_MINUTE: int = 0
+    LLM_COMPLETION_TOKENS_ESTIMATE: int = 512
+    LLM_BACKOFF_MAX_SECONDS: float = 30.0
+
+    # Threads for synchronous work (PDF parsing, FAISS, Google certs)
+    BLOCKING_POOL_WORKERS: int = 16
+
+    # Chat memory: "summary" keeps recent turns verbatim under a token
+    # budget plus a rolling summary, "buffer" sends the whole history
+    MEMORY_MODE: str = "summary"
+    MEMORY_RECENT_TURNS: int = 6
+    MEMORY_MAX_TOKENS: int = 1500
+    # Messages that must fall out of the window before re-summarizing
+    MEMORY_SUMMARY_BATCH: int = 4
+
+    # "memory" caches per process, "redis" shares them across workers
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Users resolved from JWTs, keyed by email
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: float = 60.0
+
+    # bcrypt runs on its own pool; processes spread it over more cores
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+    # Logins/signups admitted at once before answering 503
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # PDF ingestion: uploads are stored in MongoDB part by part and pages
+    # are extracted in worker processes, PDF_PAGES_PER_TASK pages at a time
+    PDF_EXTRACT_WORKERS: int = 2
+    PDF_PAGES_PER_TASK: int = 16
+
+    # "react": conversational ReAct agent, one tool per step.
+    # "tools": OpenAI tool calling, several tools per step run concurrently
+    AGENT_MODE: str = "react"
+    # A tool slower than this answers with a timeout notice instead
+    WEB_SEARCH_TIMEOUT_SECONDS: float = 8.0
+    RESEARCH_TIMEOUT_SECONDS: float = 8.0
+    # Each turn is routed to direct chat, PDF QA or the agent: rules,
+    # then similarity to labelled examples (mean of the best
+    # INTENT_ROUTER_K per route). Direct chat must beat the agent by
+    # INTENT_ROUTER_CHAT_MARGIN. The similarity stage embeds every input,
+    # so by default it runs only with EMBEDDING_PROVIDER=local; without it
+    # inputs no rule settles go to the agent.
+    INTENT_ROUTER_EMBEDDINGS: bool | None = None
+    INTENT_ROUTER_K: int = 3
+    INTENT_ROUTER_CHAT_MARGIN: float = 0.02
+
+    # Upstream endpoints of the agent tools
+    SERPAPI_URL: str = "https://serpapi.com/search.json"
+    ARXIV_API_URL: str = "http://export.arxiv.org/api/query"
+
+    # Results of the web_search / research_papers tools, by query
+    TOOL_CACHE_SIZE: int = 1024
+    WEB_SEARCH_CACHE_TTL_SECONDS: float = 600.0
+    RESEARCH_CACHE_TTL_SECONDS: float = 3600.0
+    # Also keep tool results in Mongo so they outlive restarts
+    TOOL_CACHE_PERSIST: bool = False
+
+    # "openai", or "local": an ONNX sentence-embedding model on the CPU
+    # (needs onnxruntime and tokenizers; EMBEDDING_MODEL_DIR holds
+    # model.onnx and tokenizer.json)
+    EMBEDDING_PROVIDER: str = "openai"
+    EMBEDDING_MODEL_DIR: str = "models/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_THREADS: int = 4
+    # Vectors by hash of model and text
+    EMBEDDING_CACHE_SIZE: int = 4096
+    EMBEDDING_CACHE_TTL_SECONDS: float = 86400.0
+
+    # PDF retrieval: RETRIEVAL_FETCH_K candidates each from FAISS and BM25,
+    # fused by reciprocal rank, the best RETRIEVAL_K kept unless asked for
+    # more; MMR optionally trades relevance for diversity among them
+    RETRIEVAL_K: int = 4
+    RETRIEVAL_FETCH_K: int = 20
+    RETRIEVAL_RRF_K: int = 60
+    RETRIEVAL_MMR: bool = False
+    RETRIEVAL_MMR_LAMBDA: float = 0.5
+    # PDF QA prompt context: the best of CONTEXT_CANDIDATES retrieved
+    # chunks that fit in CONTEXT_TOKEN_BUDGET tokens, neighbouring chunks
+    # merged. Questions about a whole document larger than the budget are
+    # answered map-reduce over groups of chunks of up to the budget each,
+    # CONTEXT_MAP_CONCURRENCY groups at a time.
+    CONTEXT_CANDIDATES: int = 12
+    CONTEXT_TOKEN_BUDGET: int = 2000
+    CONTEXT_MAP_CONCURRENCY: int = 16
+
+    # Per-user limits on chat and upload: a token bucket of *_BURST
+    # requests refilled at *_PER_MINUTE, and at most CONCURRENCY_LIMIT_*
+    # requests in flight. "memory" counts per worker, "redis" across
+    # workers (REDIS_URL); Redis leases expire after
+    # CONCURRENCY_LEASE_SECONDS should a worker die holding them
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_CHAT_PER_MINUTE: float = 20.0
+    RATE_LIMIT_CHAT_BURST: int = 10
+    CONCURRENCY_LIMIT_CHAT: int = 2
+    RATE_LIMIT_UPLOAD_PER_MINUTE: float = 6.0
+    RATE_LIMIT_UPLOAD_BURST: int = 3
+    CONCURRENCY_LIMIT_UPLOAD: int = 2
+    CONCURRENCY_LEASE_SECONDS: float = 600.0
+
+    # Requests slower than this are logged with their per-stage spans
+    TRACE_SLOW_REQUEST_SECONDS: float = 5.0
+
+    # Reuse answers to near-identical questions (cosine similarity of the
+    # input embeddings); PDF answers are scoped to the document
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_SIZE: int = 2048
+    SEMANTIC_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Background jobs (PDF processing) run by in-process workers and
+    # persisted in the jobs collection; a job copies its upload to the
+    # spool dir for extraction
+    JOB_WORKERS: int = 2
+    JOB_POLL_SECONDS: float = 5.0
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_MAX_ATTEMPTS: int = 3
+    UPLOAD_SPOOL_DIR: str = "/tmp/m2-uploads"
+    # Chunk and embed in the job; otherwise on the first PDF question
+    PDF_EMBED_ON_UPLOAD: bool = True
+    # Document pages and chunks are stored once per content hash,
+    # compressed with zstandard at this level
+    PDF_STORE_ZSTD_LEVEL: int = 3
 
     class Config:
         env_file = ".env"
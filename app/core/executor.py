@@ -0,0 +1,58 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.core.config import settings
+
+# Bounded pool for library calls that have no async API
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_POOL_WORKERS,
+    thread_name_prefix="blocking"
+)
+
+# bcrypt is deliberately slow; keep it apart so it cannot starve the
+# blocking pool. Jobs for a process pool must be picklable module-level
+# functions. Workers start on the first login, after Motor's threads,
+# so they are spawned rather than forked.
+if settings.PASSWORD_HASH_USE_PROCESSES:
+    password_executor = ProcessPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"))
+else:
+    password_executor = ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        thread_name_prefix="password"
+    )
+
+_pdf_executor = None
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """
+    Process pool for PDF page extraction, created on first use. Workers
+    are spawned rather than forked so they never inherit Motor's threads.
+    """
+    global _pdf_executor
+    if _pdf_executor is None:
+        _pdf_executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_executor
+
+
+def shutdown_pdf_executor():
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a synchronous callable on the blocking pool without stalling
+    the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        blocking_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,48 @@
+import httpx
+from app.core.config import settings
+from app.core.llm_gateway import create_gateway_transport
+
+_client: httpx.AsyncClient | None = None
+_openai_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Process-wide async HTTP client so outbound calls share a keep-alive
+    connection pool instead of blocking the event loop
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS
+            )
+        )
+    return _client
+
+
+def get_openai_http_client() -> httpx.AsyncClient:
+    """
+    Async HTTP client handed to every OpenAI chat/embedding client so they
+    share one keep-alive pool with LLM-sized timeouts, behind the LLM
+    gateway's scheduler
+    """
+    global _openai_client
+    if _openai_client is None or _openai_client.is_closed:
+        _openai_client = httpx.AsyncClient(
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            transport=create_gateway_transport()
+        )
+    return _openai_client
+
+
+async def close_http_client():
+    global _client, _openai_client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _openai_client is not None:
+        await _openai_client.aclose()
+        _openai_client = None
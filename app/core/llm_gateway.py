@@ -0,0 +1,280 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import time
+from contextlib import contextmanager
+import httpx
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+from app.core.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Dispatch order of waiting requests: lower first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+llm_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+llm_wait_seconds = Histogram(
+    "llm_gateway_wait_seconds", "Time LLM requests queued in the gateway",
+    ("priority",))
+llm_throttled = Counter(
+    "llm_gateway_throttled_total", "429 responses from the LLM provider")
+
+
+@contextmanager
+def background_priority():
+    """
+    LLM calls made inside yield to interactive ones
+    """
+    token = llm_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        llm_priority.reset(token)
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """
+    Tokens a chat completion or embedding request will use against the
+    provider's per-minute limit: its input counted with tiktoken, plus
+    the expected completion
+    """
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return 1
+    if "messages" in body:
+        tokens = 0
+        for message in body["messages"]:
+            content = message.get("content") or ""
+            if isinstance(content, list):
+                content = " ".join(part.get("text", "") for part in content)
+            tokens += count_tokens(content) + 4
+        completion = (body.get("max_completion_tokens") or
+                      body.get("max_tokens") or
+                      settings.LLM_COMPLETION_TOKENS_ESTIMATE)
+        return tokens + completion
+    inputs = body.get("input", "")
+    if isinstance(inputs, str):
+        return count_tokens(inputs)
+    return sum(len(item) if isinstance(item, list) else count_tokens(item)
+               for item in inputs)
+
+
+class LLMScheduler:
+    """
+    Admits LLM requests by priority under a concurrency limit and a
+    token-per-minute budget. A 429 halves the concurrency limit and holds
+    all dispatch for the provider's Retry-After; every `limit` successes
+    in a row raise the limit by one again, up to the configured maximum.
+    """
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int,
+                 max_backoff: float):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.max_backoff = max_backoff
+        self.active = 0
+        self.throttled = 0
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._successes = 0
+        self._throttle_streak = 0
+        self._waiters = []  # heap of (priority, seq, tokens, future)
+        self._seq = itertools.count()
+        self._timer = None
+
+    async def acquire(self, priority: int, tokens: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters,
+                       (priority, next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # admitted just as the caller gave up
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def on_success(self):
+        self._throttle_streak = 0
+        self._successes += 1
+        if self.limit < self.max_concurrency and \
+                self._successes >= self.limit:
+            self.limit += 1
+            self._successes = 0
+
+    def on_throttled(self, retry_after: float | None):
+        self.throttled += 1
+        llm_throttled.inc()
+        self._throttle_streak += 1
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+        self._tokens = min(self._tokens, 0.0)
+        if retry_after is None:
+            retry_after = min(self.max_backoff,
+                              0.5 * 2 ** (self._throttle_streak - 1))
+        self._paused_until = max(self._paused_until,
+                                 time.monotonic() + retry_after)
+        logger.warning("LLM provider throttled, concurrency limit %d, "
+                       "pausing %.1fs", self.limit, retry_after)
+
+    def _refill(self, now: float):
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + (now - self._refilled_at) *
+                self.tokens_per_minute / 60)
+        self._refilled_at = now
+
+    def _dispatch(self):
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():  # caller cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if now < self._paused_until:
+                self._wake_in(self._paused_until - now)
+                return
+            if self.active >= self.limit:
+                return
+            if self.tokens_per_minute:
+                # A request bigger than the budget waits for a full bucket
+                needed = min(tokens, self.tokens_per_minute)
+                if self._tokens < needed:
+                    self._wake_in((needed - self._tokens) * 60 /
+                                  self.tokens_per_minute)
+                    return
+                self._tokens -= needed
+            heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(None)
+
+    def _wake_in(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(
+            delay, self._dispatch)
+
+    def stats(self) -> dict:
+        return {"active": self.active, "limit": self.limit,
+                "waiting": sum(1 for *_, f in self._waiters if not f.done()),
+                "throttled": self.throttled}
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return None
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """
+    Response body that gives the scheduler slot back once it has been
+    read or closed, so streamed completions hold their slot throughout
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release:
+                release, self._release = self._release, None
+                release()
+
+
+class LLMGatewayTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport for every OpenAI client: requests wait their turn in
+    the scheduler, then go out over one shared connection pool
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport,
+                 scheduler: LLMScheduler):
+        self._transport = transport
+        self.scheduler = scheduler
+
+    async def handle_async_request(self, request: httpx.Request):
+        priority = llm_priority.get()
+        tokens = estimate_tokens(request)
+        start = time.perf_counter()
+        await self.scheduler.acquire(priority, tokens)
+        llm_wait_seconds.observe(time.perf_counter() - start,
+                                 priority=PRIORITY_NAMES[priority])
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.scheduler.release()
+            raise
+
+        if response.status_code == 429:
+            self.scheduler.on_throttled(_retry_after(response))
+        elif response.status_code < 400:
+            self.scheduler.on_success()
+        response.stream = _ReleasingStream(response.stream,
+                                           self.scheduler.release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# One per worker process; limits and budgets apply per worker
+scheduler = LLMScheduler(settings.LLM_MAX_CONCURRENCY,
+                         settings.LLM_TOKENS_PER_MINUTE,
+                         settings.LLM_BACKOFF_MAX_SECONDS)
+
+
+def create_gateway_transport() -> LLMGatewayTransport:
+    """
+    Gateway over a keep-alive pool, HTTP/2 when OPENAI_HTTP2 is set and
+    the 'h2' package is installed
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=settings.OPENAI_HTTP2 and http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS
+        )
+    )
+    return LLMGatewayTransport(transport, scheduler)
@@ -0,0 +1,240 @@
+import bisect
+import contextvars
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cache hits to slow LLM runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0, 60.0)
+
+# Every metric by name, in registration order
+_registry = {}
+
+# Spans of the request being handled: (stage, start offset, seconds, attrs)
+_trace = contextvars.ContextVar("trace", default=None)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+
+def _label_text(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        _registry[name] = self
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(
+                f"{self.name}{_label_text(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        _registry[name] = self
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [[0] * (len(self.buckets) + 1),
+                                          0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(
+                    (*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                labels = _label_text((*self.labels, "le"), (*key, le))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """
+    All metrics of this process in the Prometheus text format
+    """
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_request_seconds = Histogram(
+    "http_request_seconds", "HTTP request latency until the response starts",
+    ("method", "route", "status"))
+stage_seconds = Histogram(
+    "stage_seconds", "Time spent per pipeline stage", ("stage",))
+llm_seconds = Histogram(
+    "llm_seconds", "Chat model call latency", ("model",))
+llm_tokens = Counter(
+    "llm_tokens_total", "Chat model tokens", ("model", "kind"))
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    Time a stage into stage_seconds and, inside a traced request, record
+    it as a span of that request
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace["spans"].append(
+                (stage, start - trace["start"], elapsed, attrs))
+
+
+def format_trace(trace: dict) -> str:
+    return " ".join(
+        f"{stage}@{offset * 1000:.0f}ms={seconds * 1000:.1f}ms"
+        + "".join(f"[{k}={v}]" for k, v in attrs.items())
+        for stage, offset, seconds, attrs in trace["spans"])
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records latency and token usage of every chat model call
+    """
+
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._starts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            llm_seconds.observe(time.perf_counter() - start, model=self.model)
+        for usage in _usages(response):
+            llm_tokens.inc(usage.get("input_tokens", 0),
+                           model=self.model, kind="prompt")
+            llm_tokens.inc(usage.get("output_tokens", 0),
+                           model=self.model, kind="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """
+    Adds up the tokens of the chat model calls it is passed to, e.g. all
+    calls behind one answer
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        for usage in _usages(response):
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+
+def _usages(response):
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None),
+                            "usage_metadata", None)
+            if usage:
+                yield usage
+
+
+class RequestTracingMiddleware:
+    """
+    ASGI middleware giving each HTTP request an id (X-Request-ID, taken
+    from the client when sent) and a trace collecting its spans.
+    Latency is measured until the response starts; requests that take
+    longer than TRACE_SLOW_REQUEST_SECONDS to finish, streamed bodies
+    included, are logged stage by stage.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        request_id_var.set(request_id)
+        trace = {"start": time.perf_counter(), "spans": []}
+        _trace.set(trace)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                http_request_seconds.observe(
+                    time.perf_counter() - trace["start"],
+                    method=scope["method"],
+                    route=route.path if route else "unmatched",
+                    status=message["status"])
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - trace["start"]
+            if elapsed >= settings.TRACE_SLOW_REQUEST_SECONDS:
+                logger.warning(
+                    "slow request %s %s %s %.3fs: %s", request_id,
+                    scope["method"], scope["path"], elapsed,
+                    format_trace(trace))
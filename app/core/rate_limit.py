@@ -0,0 +1,142 @@
+import time
+import uuid
+from cachetools import LRUCache
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional, only needed for RATE_LIMIT_BACKEND=redis
+    aioredis = None
+
+# Token bucket: refill for the time since the last request, then take
+# one token. Times come from the Redis server so workers agree.
+_TAKE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+# In-flight requests as a sorted set of lease ids scored by expiry, so
+# leases of a worker that died run out instead of leaking
+_ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class MemoryRateLimiter:
+    """
+    Token buckets and in-flight counts local to this process
+    """
+
+    def __init__(self, maxsize: int):
+        self._buckets = LRUCache(maxsize=maxsize)  # key -> (tokens, time)
+        self._in_flight = {}
+
+    async def take(self, key: str, rate: float,
+                   burst: int) -> tuple[bool, float]:
+        """
+        Take a token from the bucket of `key`, refilled at `rate` per
+        second up to `burst`. Returns whether one was left, and how many
+        tokens remain.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    async def acquire(self, key: str, limit: int) -> str | None:
+        """
+        Claim one of the `limit` in-flight slots of `key`. Returns a lease
+        to release when done, or None when all slots are taken.
+        """
+        if self._in_flight.get(key, 0) >= limit:
+            return None
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        return key
+
+    async def release(self, key: str, lease: str):
+        count = self._in_flight.pop(key, 0) - 1
+        if count > 0:
+            self._in_flight[key] = count
+
+
+class RedisRateLimiter:
+    """
+    Token buckets and in-flight counts shared by all workers through any
+    Redis-protocol server
+    """
+
+    def __init__(self, url: str, lease_seconds: float):
+        if aioredis is None:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self._redis = aioredis.from_url(url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._acquire = self._redis.register_script(_ACQUIRE_SCRIPT)
+        self._lease_ms = int(lease_seconds * 1000)
+
+    async def take(self, key: str, rate: float,
+                   burst: int) -> tuple[bool, float]:
+        allowed, tokens = await self._take(
+            keys=[f"ratelimit:bucket:{key}"], args=[rate, burst])
+        return bool(allowed), float(tokens)
+
+    async def acquire(self, key: str, limit: int) -> str | None:
+        lease = uuid.uuid4().hex
+        acquired = await self._acquire(
+            keys=[f"ratelimit:inflight:{key}"],
+            args=[limit, self._lease_ms, lease])
+        return lease if acquired else None
+
+    async def release(self, key: str, lease: str):
+        await self._redis.zrem(f"ratelimit:inflight:{key}", lease)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    """
+    Process-wide limiter on the configured backend (RATE_LIMIT_BACKEND)
+    """
+    global _limiter
+    if _limiter is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            _limiter = RedisRateLimiter(
+                settings.REDIS_URL, settings.CONCURRENCY_LEASE_SECONDS)
+        else:
+            _limiter = MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+    return _limiter
+
+
+async def close_rate_limiter():
+    if isinstance(_limiter, RedisRateLimiter):
+        await _limiter.close()
@@ -0,0 +1,28 @@
+import logging
+from functools import lru_cache
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        # tiktoken downloads its BPE files on first use
+        logger.warning("tiktoken encoding unavailable (%s), estimating", e)
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """
+    Number of tokens `text` costs for `model`; roughly 4 characters per
+    token when the tiktoken encoding cannot be loaded
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,128 @@
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from app.db.mongo import messages_collection, sessions_collection
+
+
+async def ensure_message_indexes():
+    await messages_collection.create_index(
+        [("session_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+
+
+async def load_messages(session_id: str) -> list[dict]:
+    """
+    All stored turns of a session, oldest first
+    """
+    cursor = messages_collection.find(
+        {"session_id": session_id},
+        {"_id": 0, "type": 1, "content": 1}
+    ).sort("seq", ASCENDING)
+    return await cursor.to_list(length=None)
+
+
+async def load_recent_messages(session_id: str, min_seq: int,
+                               limit: int) -> list[dict]:
+    """
+    Up to `limit` turns with seq >= min_seq, newest first
+    """
+    cursor = messages_collection.find(
+        {"session_id": session_id, "seq": {"$gte": min_seq}},
+        {"_id": 0, "seq": 1, "type": 1, "content": 1}
+    ).sort("seq", DESCENDING).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def load_message_range(session_id: str, start: int,
+                             end: int) -> list[dict]:
+    """
+    Turns with start <= seq < end, oldest first
+    """
+    cursor = messages_collection.find(
+        {"session_id": session_id, "seq": {"$gte": start, "$lt": end}},
+        {"_id": 0, "type": 1, "content": 1}
+    ).sort("seq", ASCENDING)
+    return await cursor.to_list(length=None)
+
+
+async def page_messages(session_id: str, limit: int, newest_first: bool,
+                        after_seq: int | None = None) -> list[dict]:
+    """
+    Up to `limit` turns in seq order (descending when newest_first),
+    starting after seq `after_seq`
+    """
+    query = {"session_id": session_id}
+    if after_seq is not None:
+        query["seq"] = {"$lt" if newest_first else "$gt": after_seq}
+    cursor = messages_collection.find(
+        query, {"_id": 0, "seq": 1, "type": 1, "content": 1, "created_at": 1}
+    ).sort("seq", DESCENDING if newest_first else ASCENDING).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def append_messages(session_id: str, user_id: str, messages: list[dict],
+                          fields: dict | None = None) -> int:
+    """
+    Reserve sequence numbers on the session document and insert only the
+    new turns. Session fields in `fields` are $set in the same update;
+    `user_id` owns the session only when the append creates it.
+    Returns the session's message count after the append.
+    """
+    now = datetime.utcnow()
+    session = await sessions_collection.find_one_and_update(
+        {"session_id": session_id},
+        {
+            "$inc": {"message_count": len(messages)},
+            "$set": {"updated_at": now, **(fields or {})},
+            "$setOnInsert": {"user_id": user_id}
+        },
+        projection={"message_count": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if not messages:
+        return session["message_count"]
+
+    first_seq = session["message_count"] - len(messages)
+    await messages_collection.insert_many([
+        {
+            "session_id": session_id,
+            "seq": first_seq + i,
+            "type": msg["type"],
+            "content": msg["content"],
+            "created_at": now
+        }
+        for i, msg in enumerate(messages)
+    ])
+    return session["message_count"]
+
+
+async def migrate_legacy_messages(session: dict):
+    """
+    Move a transcript stored inline on the session document (before
+    append-only storage) into the messages collection
+    """
+    legacy = session.get("messages")
+    if legacy is None:
+        return
+
+    if legacy:
+        now = datetime.utcnow()
+        try:
+            await messages_collection.insert_many([
+                {
+                    "session_id": session["session_id"],
+                    "seq": i,
+                    "type": msg["type"],
+                    "content": msg["content"],
+                    "created_at": session.get("updated_at", now)
+                }
+                for i, msg in enumerate(legacy)
+            ], ordered=False)
+        except BulkWriteError:
+            # Another request already migrated this session
+            pass
+
+    await sessions_collection.update_one(
+        {"session_id": session["session_id"], "messages": {"$exists": True}},
+        {"$unset": {"messages": ""}, "$set": {"message_count": len(legacy)}}
+    )
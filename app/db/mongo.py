@@ -1,8 +1,53 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
 from app.core.config import settings
 
-client = AsyncIOMotorClient(settings.MONGO_URI)
+logger = logging.getLogger(__name__)
+
+# One client per worker process; every worker holds up to
+# MONGO_MAX_POOL_SIZE connections
+client = AsyncIOMotorClient(
+    settings.MONGO_URI,
+    maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+    minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+    serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+)
 db = client[settings.MONGO_DB]
 
 users_collection = db["users"]
 sessions_collection = db["sessions"]
+messages_collection = db["messages"]
+pdf_indexes_collection = db["pdf_indexes"]
+pdf_documents_collection = db["pdf_documents"]
+pdf_contents_collection = db["pdf_contents"]
+pdf_blobs_collection = db["pdf_blobs"]
+jobs_collection = db["jobs"]
+tool_cache_collection = db["tool_cache"]
+
+
+async def ensure_core_indexes():
+    """
+    Unique lookups of users by email and sessions by session_id. Workers
+    start at the same time; creating an existing index is a no-op. Data
+    that already holds duplicates gets a plain index and a warning.
+    """
+    for collection, field in ((users_collection, "email"),
+                              (sessions_collection, "session_id")):
+        try:
+            await collection.create_index(
+                [(field, ASCENDING)], unique=True)
+        except OperationFailure as e:
+            logger.warning("%s.%s is not unique, indexing without the "
+                           "constraint: %s", collection.name, field, e)
+            await collection.create_index(
+                [(field, ASCENDING)], name=f"{field}_nonunique")
+
+
+async def ping():
+    """
+    Fail fast when MongoDB is unreachable
+    """
+    await client.admin.command("ping")
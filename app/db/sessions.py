@@ -0,0 +1,48 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from app.db.mongo import sessions_collection
+
+# Fields of a session listing; never the transcript or document text
+SESSION_SUMMARY_FIELDS = {
+    "session_id": 1, "updated_at": 1, "message_count": 1,
+    "documents.content_hash": 1, "documents.filename": 1
+}
+
+
+async def ensure_session_indexes():
+    await sessions_collection.create_index(
+        [("user_id", ASCENDING), ("updated_at", DESCENDING),
+         ("_id", DESCENDING)])
+
+
+async def list_sessions(user_id: str, limit: int,
+                        after: tuple[datetime | None, ObjectId] | None = None
+                        ) -> list[dict]:
+    """
+    Up to `limit` of a user's sessions, most recently updated first,
+    starting after the (updated_at, _id) key of the previous page.
+    Sessions without updated_at come last.
+    """
+    query = {"user_id": user_id}
+    if after:
+        updated_at, last_id = after
+        query["$or"] = [{"updated_at": updated_at, "_id": {"$lt": last_id}}]
+        if updated_at is not None:
+            # Null sorts below every date but isn't matched by $lt
+            query["$or"] += [{"updated_at": {"$lt": updated_at}},
+                             {"updated_at": None}]
+    cursor = sessions_collection.find(
+        query, SESSION_SUMMARY_FIELDS
+    ).sort([("updated_at", DESCENDING), ("_id", DESCENDING)]).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def get_session_owner(session_id: str) -> dict | None:
+    """
+    The session's owner, plus any transcript still stored inline by a
+    session from before append-only storage
+    """
+    return await sessions_collection.find_one(
+        {"session_id": session_id},
+        {"session_id": 1, "user_id": 1, "updated_at": 1, "messages": 1})
@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.cache import get_cache
+from app.core.config import settings
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:  # optional, only needed for EMBEDDING_PROVIDER=local
+    onnxruntime = None
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Sentence-embedding model exported to ONNX (a directory with
+    model.onnx and tokenizer.json, e.g. all-MiniLM-L6-v2) run on the CPU:
+    batched tokenization and inference, mean pooling over the attention
+    mask, L2 normalization
+    """
+
+    def __init__(self, model_dir: str, batch_size: int, threads: int,
+                 max_length: int = 256):
+        if onnxruntime is None:
+            raise RuntimeError("EMBEDDING_PROVIDER=local requires the "
+                               "'onnxruntime' and 'tokenizers' packages")
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(
+            os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options,
+            providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        # One inference at a time; the model itself uses `threads` cores
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="embeddings")
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(
+            weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(
+            np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # Batch texts of similar length together to minimise padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            pooled = self._embed_batch([texts[i] for i in batch])
+            for i, vector in zip(batch, pooled):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed_batch([text])[0].tolist()
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.embed_query, text)
+
+
+def _pack(vector: list[float]) -> str:
+    # float32 bytes as base64: compact, and JSON safe for Redis
+    return base64.b64encode(
+        np.asarray(vector, np.float32).tobytes()).decode("ascii")
+
+
+def _unpack(packed: str | None) -> list[float] | None:
+    if packed is None:
+        return None
+    return np.frombuffer(base64.b64decode(packed), np.float32).tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Any embeddings provider with its vectors cached by hash of model and
+    text, so repeated chunks and questions skip the model. Only the
+    async methods, which the app uses, go through the cache.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_id: str):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.cache = get_cache("embeddings",
+                               maxsize=settings.EMBEDDING_CACHE_SIZE,
+                               ttl=settings.EMBEDDING_CACHE_TTL_SECONDS)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(
+            f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = [_unpack(packed)
+                   for packed in await self.cache.get_many(keys)]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = await self.embeddings.aembed_documents(
+                [texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            await self.cache.set_many(
+                {keys[i]: _pack(vectors[i]) for i in missing})
+        return vectors
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        vector = _unpack(await self.cache.get(key))
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await self.cache.set(key, _pack(vector))
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import re
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.llm_factory import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+# Where a chat turn goes: a plain chat model call, PDF question
+# answering, or the tool-using agent
+CHAT = "chat"
+PDF = "pdf"
+AGENT = "agent"
+
+routed_turns = Counter(
+    "chat_routed_turns_total", "Chat turns by route and deciding stage",
+    ("route", "stage"))
+
+# Small talk answered without tools: the whole input must match
+_SMALL_TALK = re.compile(
+    r"^\W*(hi|hello|hey|hiya|yo|good (morning|afternoon|evening)|"
+    r"thanks?( you)?( so much| a lot)?|thank you|thx|cheers|ok(ay)?|"
+    r"cool|great|nice|awesome|perfect|got it|sounds good|yes|yeah|yep|"
+    r"no|nope|sure|bye|goodbye|see you|good night|how are you( doing)?|"
+    r"what'?s up|who are you|what can you do|what is your name|"
+    r"what('?s| is) my name|my name is [\w .'-]+)"
+    r"( there)?( again)?[\s!.,?:)]*$",
+    re.IGNORECASE
+)
+
+# Requests a chat model answers on its own: explaining, writing,
+# rewording; only the start of the input must match
+_CHAT_REQUESTS = re.compile(
+    r"^\W*((please|can you|could you|would you)\s+)?"
+    r"(explain|write|draft|compose|translate|rephrase|reword|proofread|"
+    r"tell me (a joke|something funny|a story)|help me (write|draft)|"
+    r"make (it|that|your( \w+)? answer) \w+|how do i|"
+    r"what'?s the difference between|what is the difference between)\b",
+    re.IGNORECASE
+)
+
+# Explicit references to uploaded files
+_PDF_CUES = re.compile(
+    r"\b(pdfs?|documents?|docs?|files?|uploads?|uploaded|attachments?|"
+    r"resumes?|résumés?|cvs?|"
+    r"the (report|paper|article|thesis|contract|invoice|attachment))\b",
+    re.IGNORECASE
+)
+
+# Questions about the user's own background, answered from their
+# documents when they uploaded any: first person and an attribute
+_FIRST_PERSON = re.compile(r"\b(i|i'm|i've|my)\b", re.IGNORECASE)
+_ATTRIBUTES = re.compile(
+    r"\b(skills?|experienced?|experiences|education|educational|"
+    r"stud(y|ied)|universit(y|ies)|college|degrees?|certifications?|"
+    r"certified|work(ed)?|jobs?|employers?|compan(y|ies)|roles?|"
+    r"projects?|lead|led|languages?|tools?|background|career|"
+    r"qualifications?|achievements?|program)\b",
+    re.IGNORECASE
+)
+
+# Anything needing current information or papers goes to the tools
+_AGENT_CUES = re.compile(
+    r"(https?://|www\.|\b(search|look up|google|latest|news|right now|"
+    r"this (week|month|year)|arxiv|(papers|publications|research|studies) "
+    r"(on|about)|weather|stock price|exchange rate)\b)",
+    re.IGNORECASE
+)
+
+# Labelled examples for the embedding stage; inputs are routed to the
+# label of the examples they are most similar to
+EXAMPLES = {
+    CHAT: [
+        "hello, how is it going?",
+        "thanks, that was really helpful",
+        "can you explain that more simply?",
+        "what is the difference between a list and a tuple in Python?",
+        "write a short poem about autumn",
+        "tell me a joke",
+        "how do I reverse a string in JavaScript?",
+        "translate 'good morning' into French",
+        "what does recursion mean?",
+        "give me three tips for a job interview",
+        "summarize what we talked about so far",
+        "can you rephrase your last answer?",
+        "what is the capital of Australia?",
+        "help me write an email asking for a day off",
+        "what is 15 percent of 80?",
+        "explain how a hash map works",
+        "do you remember my name?",
+        "I'm feeling a bit stressed today, any advice?",
+    ],
+    PDF: [
+        "what skills are listed in my resume?",
+        "summarize the document I uploaded",
+        "where did I work before my current job?",
+        "what is my educational background?",
+        "what does the report say about the results?",
+        "how many years of experience do I have?",
+        "what programming languages do I know?",
+        "list the certifications I hold",
+        "what was my role at my last company?",
+        "what are the main conclusions of the paper I sent?",
+        "which projects have I worked on?",
+        "what is the methodology section about?",
+        "does the contract mention a termination clause?",
+        "what are the key points on page 3?",
+        "what is my degree in?",
+        "find the total amount on the invoice",
+    ],
+    AGENT: [
+        "search the web for the latest Python release",
+        "find recent papers on retrieval augmented generation",
+        "what is the weather in Paris right now?",
+        "who won the football match last night?",
+        "what are the latest news about OpenAI?",
+        "look up the current price of bitcoin",
+        "find research papers about graph neural networks",
+        "what happened in the stock market today?",
+        "who is the current prime minister of the UK?",
+        "find academic studies on sleep and memory",
+        "what are the newest features in React 19?",
+        "search for reviews of the latest iPhone",
+        "what is trending on the internet this week?",
+        "find arxiv papers about diffusion models",
+        "when is the next SpaceX launch?",
+        "what did the central bank announce this month?",
+    ],
+}
+
+
+def _mentions(text: str, filename: str) -> bool:
+    # A file named by its name without extension, if that is distinctive
+    stem = filename.rsplit(".", 1)[0].replace("_", " ").strip()
+    return len(stem) >= 4 and re.search(
+        rf"\b{re.escape(stem)}\b", text, re.IGNORECASE) is not None
+
+
+def embeddings_enabled() -> bool:
+    if settings.INTENT_ROUTER_EMBEDDINGS is not None:
+        return settings.INTENT_ROUTER_EMBEDDINGS
+    return settings.EMBEDDING_PROVIDER == "local"
+
+
+def route_by_rules(user_input: str, filenames: list[str]) -> str | None:
+    """
+    The route of inputs a pattern settles on its own, or None
+    """
+    # "resume_2024" names the file resume 2024; _ is a word character
+    text = user_input.strip().replace("_", " ")
+    if filenames:
+        if (_PDF_CUES.search(text) or
+                any(_mentions(text, name) for name in filenames) or
+                _FIRST_PERSON.search(text) and _ATTRIBUTES.search(text)):
+            return PDF
+    if _AGENT_CUES.search(text):
+        return AGENT
+    if _SMALL_TALK.match(text) or _CHAT_REQUESTS.match(text):
+        return CHAT
+    return None
+
+
+class IntentRouter:
+    """
+    Routes a chat turn to direct chat, PDF QA or the tool agent: rules
+    first, then the labelled examples most similar to the input by
+    embedding (mean of the best `k` cosine similarities per route).
+    Direct chat must win by `chat_margin` over the agent, which can
+    answer anything, just at a higher cost.
+    """
+
+    def __init__(self, examples: dict, k: int, chat_margin: float):
+        self.examples = examples
+        self.k = k
+        self.chat_margin = chat_margin
+        self._labels = None
+        self._vectors = None
+        self._lock = asyncio.Lock()
+
+    async def _example_vectors(self):
+        async with self._lock:
+            if self._vectors is None:
+                labels, texts = [], []
+                for label, examples in self.examples.items():
+                    labels.extend([label] * len(examples))
+                    texts.extend(examples)
+                vectors = np.array(
+                    await get_embeddings().aembed_documents(texts),
+                    dtype=np.float32)
+                vectors /= np.clip(np.linalg.norm(
+                    vectors, axis=1, keepdims=True), 1e-12, None)
+                self._labels = np.array(labels)
+                self._vectors = vectors
+        return self._labels, self._vectors
+
+    async def warm_up(self):
+        """
+        Embed the labelled examples ahead of the first routed turn
+        """
+        if not embeddings_enabled():
+            return
+        try:
+            await self._example_vectors()
+        except Exception as e:
+            logger.warning("Intent example embeddings failed: %s", e)
+
+    async def scores(self, user_input: str) -> dict[str, float]:
+        """
+        Similarity of the input to each route's examples
+        """
+        labels, vectors = await self._example_vectors()
+        query = np.array(await get_embeddings().aembed_query(user_input),
+                         dtype=np.float32)
+        similarity = vectors @ (query / max(np.linalg.norm(query), 1e-12))
+        return {
+            label: float(np.sort(similarity[labels == label])[-self.k:].mean())
+            for label in self.examples
+        }
+
+    def _pick(self, scores: dict[str, float], has_documents: bool) -> str:
+        if not has_documents:
+            scores = {k: v for k, v in scores.items() if k != PDF}
+        best = max(scores, key=scores.get)
+        if best == CHAT and scores[CHAT] - scores[AGENT] < self.chat_margin:
+            return AGENT
+        return best
+
+    async def route(self, user_input: str,
+                    filenames: list[str]) -> tuple[str, str]:
+        """
+        The route of a turn and the stage that decided it: "rules",
+        "embeddings", or "fallback" when the embedding model failed
+        """
+        intent = route_by_rules(user_input, filenames)
+        stage = "rules"
+        if intent is None:
+            if embeddings_enabled():
+                try:
+                    intent = self._pick(await self.scores(user_input),
+                                        bool(filenames))
+                    stage = "embeddings"
+                except Exception as e:
+                    logger.warning("Intent embeddings failed: %s", e)
+            if intent is None:
+                intent, stage = AGENT, "fallback"
+        routed_turns.inc(route=intent, stage=stage)
+        return intent, stage
+
+
+intent_router = IntentRouter(
+    EXAMPLES,
+    k=settings.INTENT_ROUTER_K,
+    chat_margin=settings.INTENT_ROUTER_CHAT_MARGIN
+)
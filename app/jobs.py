@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from app.core.config import settings
+from app.core.llm_gateway import background_priority
+from app.core.metrics import span
+from app.db.mongo import jobs_collection
+
+logger = logging.getLogger(__name__)
+
+# kind -> async handler(job: JobContext, payload: dict) -> dict
+_handlers = {}
+
+
+def register_handler(kind: str):
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+async def ensure_job_indexes():
+    await jobs_collection.create_index(
+        [("status", ASCENDING), ("created_at", ASCENDING)])
+
+
+class JobContext:
+    """
+    Handed to a job handler to record per-stage timings and progress
+    """
+
+    def __init__(self, job: dict):
+        self.job_id = job["_id"]
+        self.kind = job["kind"]
+        self.attempts = job.get("attempts", 1)
+
+    @property
+    def is_last_attempt(self) -> bool:
+        return self.attempts >= settings.JOB_MAX_ATTEMPTS
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        await jobs_collection.update_one(
+            {"_id": self.job_id},
+            {"$set": {"stage": name,
+                      f"stages.{name}.started_at": started_at}}
+        )
+        with span(f"{self.kind}.{name}"):
+            yield
+        await jobs_collection.update_one(
+            {"_id": self.job_id},
+            {"$set": {f"stages.{name}.seconds":
+                      round(time.perf_counter() - start, 3)}}
+        )
+
+    async def progress(self, **fields):
+        await jobs_collection.update_one(
+            {"_id": self.job_id},
+            {"$set": {f"progress.{k}": v for k, v in fields.items()}}
+        )
+
+
+async def enqueue_job(kind: str, payload: dict,
+                      user_id: str | None = None) -> str:
+    """
+    Persist a queued job and wake a local worker; returns the job id.
+    `user_id` is the user allowed to see its status.
+    """
+    job_id = str(uuid.uuid4())
+    await jobs_collection.insert_one({
+        "_id": job_id,
+        "kind": kind,
+        "user_id": user_id,
+        "status": "queued",
+        "payload": payload,
+        "attempts": 0,
+        "created_at": datetime.utcnow()
+    })
+    job_pool.wake()
+    return job_id
+
+
+async def get_job(job_id: str) -> dict | None:
+    return await jobs_collection.find_one({"_id": job_id}, {"payload": 0})
+
+
+class JobWorkerPool:
+    """
+    JOB_WORKERS tasks per process pulling jobs from the jobs collection.
+    Running jobs hold a lease that is renewed while they run; a job whose
+    lease lapsed (its worker died) is picked up again by any worker.
+    """
+
+    def __init__(self):
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def start(self):
+        self._stopping = False
+        for i in range(settings.JOB_WORKERS):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{i}"
+            self._tasks.append(asyncio.create_task(self._run(worker_id)))
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self, worker_id: str) -> dict | None:
+        now = datetime.utcnow()
+        return await jobs_collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(
+                        seconds=settings.JOB_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _renew_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            await jobs_collection.update_one(
+                {"_id": job_id, "status": "running"},
+                {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(
+                    seconds=settings.JOB_LEASE_SECONDS)}}
+            )
+
+    async def _run(self, worker_id: str):
+        while not self._stopping:
+            try:
+                job = await self._claim(worker_id)
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), settings.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._execute(job)
+
+    async def _execute(self, job: dict):
+        handler = _handlers.get(job["kind"])
+        lease = asyncio.create_task(self._renew_lease(job["_id"]))
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler for job kind {job['kind']}")
+            if job["attempts"] > settings.JOB_MAX_ATTEMPTS:
+                # Its worker died during the last allowed attempt
+                raise RuntimeError("Job exceeded its maximum attempts")
+            # Jobs' LLM and embedding calls wait behind interactive ones
+            with background_priority():
+                result = await handler(JobContext(job), job["payload"])
+            update = {"status": "done", "result": result}
+        except asyncio.CancelledError:
+            # Shutting down: leave the lease to lapse so the job is retried
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job["_id"])
+            retry = job["attempts"] < settings.JOB_MAX_ATTEMPTS
+            update = {"status": "queued" if retry else "failed",
+                      "error": str(e)}
+        finally:
+            lease.cancel()
+
+        update["finished_at"] = datetime.utcnow()
+        await jobs_collection.update_one({"_id": job["_id"]}, {"$set": update})
+
+
+job_pool = JobWorkerPool()
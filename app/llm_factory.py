@@ -0,0 +1,158 @@
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain.agents import (
+    AgentExecutor, AgentType, create_openai_tools_agent, initialize_agent)
+from langchain.chains.question_answering import load_qa_chain
+from langchain.memory import ConversationBufferMemory
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from app.core.config import settings
+from app.core.http import get_openai_http_client
+from app.core.metrics import MetricsCallbackHandler
+from app.embeddings import CachedEmbeddings, LocalEmbeddings
+from app.tools.research_tool import research_papers
+from app.tools.tool_timeout import with_timeout
+from app.tools.web_search_tool import web_search
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+CHAT_MODEL_NAME = "gpt-3.5-turbo"
+
+# Tools available to the chat agent
+AGENT_TOOLS = [
+    with_timeout(research_papers, settings.RESEARCH_TIMEOUT_SECONDS),
+    with_timeout(web_search, settings.WEB_SEARCH_TIMEOUT_SECONDS),
+]
+
+TOOLS_AGENT_SYSTEM_PROMPT = (
+    "You are a helpful assistant. Use the tools when a question needs "
+    "current information or academic papers. When a question needs more "
+    "than one tool, call them together in a single step. If a tool did "
+    "not respond, answer from the results you have."
+)
+
+DIRECT_CHAT_SYSTEM_PROMPT = (
+    "You are a helpful assistant. Answer conversationally and concisely."
+)
+
+# Map step of map-reduce PDF QA: what one group of chunks says about
+# the question
+MAP_PROMPT = ChatPromptTemplate.from_template(
+    "Below is one part of a longer document. Copy or concisely restate "
+    "everything in it that helps answer the question, keeping names, "
+    "figures and dates. If nothing in it is relevant, answer NONE.\n\n"
+    "Question: {question}\n\nDocument part:\n{context}"
+)
+
+# Everything below is stateless and built once per process; callers bind
+# their per-request state (memory, callbacks) at call time.
+
+
+@lru_cache(maxsize=None)
+def get_chat_model() -> ChatOpenAI:
+    return ChatOpenAI(
+        model=CHAT_MODEL_NAME,
+        temperature=0.7,
+        api_key=OPENAI_API_KEY,
+        streaming=True,
+        stream_usage=True,
+        callbacks=[MetricsCallbackHandler(CHAT_MODEL_NAME)],
+        http_async_client=get_openai_http_client()
+    )
+
+
+@lru_cache(maxsize=None)
+def get_embeddings() -> CachedEmbeddings:
+    """
+    The EMBEDDING_PROVIDER model behind the embedding cache. Its model_id
+    tells vectors of different models apart.
+    """
+    if settings.EMBEDDING_PROVIDER == "local":
+        model_dir = settings.EMBEDDING_MODEL_DIR
+        return CachedEmbeddings(
+            LocalEmbeddings(model_dir,
+                            batch_size=settings.EMBEDDING_BATCH_SIZE,
+                            threads=settings.EMBEDDING_THREADS),
+            model_id=f"local:{os.path.basename(model_dir.rstrip('/'))}"
+        )
+
+    embeddings = OpenAIEmbeddings(
+        api_key=OPENAI_API_KEY,
+        chunk_size=settings.OPENAI_EMBEDDING_BATCH_SIZE,
+        http_async_client=get_openai_http_client()
+    )
+    return CachedEmbeddings(embeddings, model_id=f"openai:{embeddings.model}")
+
+
+@lru_cache(maxsize=None)
+def get_agent():
+    """
+    The chat agent for AGENT_MODE: prompt, tool descriptions and output
+    parser, without memory
+    """
+    if settings.AGENT_MODE == "tools":
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", TOOLS_AGENT_SYSTEM_PROMPT),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{input}"),
+            MessagesPlaceholder("agent_scratchpad"),
+        ])
+        return create_openai_tools_agent(get_chat_model(), AGENT_TOOLS, prompt)
+
+    executor = initialize_agent(
+        tools=AGENT_TOOLS,
+        llm=get_chat_model(),
+        agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
+        verbose=False,
+        handle_parsing_errors=True
+    )
+    return executor.agent
+
+
+def new_memory() -> ConversationBufferMemory:
+    """
+    Empty per-request memory in the shape the agent's prompt expects: the
+    ReAct prompt takes the history as text, the tools prompt as messages
+    """
+    return ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=settings.AGENT_MODE == "tools"
+    )
+
+
+def build_agent_executor(memory) -> AgentExecutor:
+    """
+    Cheap per-request executor binding a session's memory to the shared
+    agent
+    """
+    return AgentExecutor(
+        agent=get_agent(),
+        tools=AGENT_TOOLS,
+        memory=memory,
+        verbose=False,
+        handle_parsing_errors=True
+    )
+
+
+@lru_cache(maxsize=None)
+def get_qa_chain():
+    return load_qa_chain(get_chat_model(), chain_type="stuff")
+
+
+@lru_cache(maxsize=None)
+def get_map_chain():
+    return MAP_PROMPT | get_chat_model() | StrOutputParser()
+
+
+def warm_up():
+    """
+    Build the shared clients and chains ahead of the first request
+    """
+    get_chat_model()
+    get_embeddings()
+    get_agent()
+    get_qa_chain()
+    get_map_chain()
@@ -1,11 +1,64 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.core.cache import close_caches
 from app.core.config import settings
-from app.api.v1 import auth, chat, health, chat_pdf
+from app.core.executor import shutdown_pdf_executor
+from app.core.http import close_http_client
+from app.core.metrics import RequestTracingMiddleware
+from app.core.rate_limit import close_rate_limiter
+from app.chat_memory import drain_summary_updates
+from app.chat_stream import drain_background_turns
+from app.db.messages import ensure_message_indexes
+from app.db.mongo import client, ensure_core_indexes, ping
+from app.db.sessions import ensure_session_indexes
+from app.intent_router import intent_router
+from app.jobs import ensure_job_indexes, job_pool
+from app.llm_factory import warm_up
+from app.tools.tool_cache import ensure_tool_cache_indexes
+from app.api.v1 import auth, chat, health, chat_pdf, metrics
 import uvicorn
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once in every worker process
+    await ping()
+    await ensure_core_indexes()
+    await ensure_session_indexes()
+    await ensure_message_indexes()
+    await ensure_job_indexes()
+    await ensure_tool_cache_indexes()
+    warm_up()
+    await intent_router.warm_up()
+    if settings.WORKERS > 1 and settings.CACHE_BACKEND == "memory":
+        logger.warning("CACHE_BACKEND=memory with %d workers: each worker "
+                       "keeps its own caches", settings.WORKERS)
+    await job_pool.start()
+    yield
+    # The server has stopped accepting requests and waited for open
+    # ones; finish turns whose client left and pending summaries
+    await job_pool.stop()
+    unfinished = await drain_background_turns(
+        settings.GRACEFUL_SHUTDOWN_SECONDS)
+    unfinished += await drain_summary_updates(
+        settings.GRACEFUL_SHUTDOWN_SECONDS)
+    if unfinished:
+        logger.warning("Shutting down with %d background tasks unfinished",
+                       unfinished)
+    await close_http_client()
+    await close_caches()
+    await close_rate_limiter()
+    shutdown_pdf_executor()
+    client.close()
+
 
 def create_application() -> FastAPI:
-    app = FastAPI(title=settings.PROJECT_NAME)
+    app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+    app.add_middleware(RequestTracingMiddleware)
+    app.include_router(metrics.router)
     app.include_router(health.router, prefix=settings.API_V1_STR + "/health")
     app.include_router(auth.router, prefix=settings.API_V1_STR + "/auth")
     app.include_router(chat.router, prefix=settings.API_V1_STR + "/chat")
@@ -19,10 +72,15 @@ app = create_application()
 
 
 if __name__ == "__main__":
+    # Production entry point: WORKERS processes sharing the port, each
+    # with its own lifespan, Mongo pool and event loop
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
+        workers=settings.WORKERS,
+        timeout_graceful_shutdown=int(settings.GRACEFUL_SHUTDOWN_SECONDS),
+        proxy_headers=True,
         reload=False,
         log_level="info"
     )
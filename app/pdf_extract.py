@@ -0,0 +1,15 @@
+import PyPDF2
+
+# Runs inside PDF worker processes; keep imports light
+
+
+def count_pages(path: str) -> int:
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def extract_page_range(path: str, start: int, end: int) -> list[str]:
+    """
+    Text of pages [start, end) of the PDF at `path`
+    """
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
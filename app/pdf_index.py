@@ -0,0 +1,284 @@
+import hashlib
+from datetime import datetime
+import faiss
+import numpy as np
+from cachetools import LRUCache
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import span
+from app.db.mongo import pdf_indexes_collection
+from app.llm_factory import get_embeddings
+from app.pdf_store import load_indexed, save_indexed
+from app.retrieval import BM25Index, term_counts
+
+# Characters a chunk may repeat from the end of the one before it
+CHUNK_OVERLAP = 50
+
+splitter = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=CHUNK_OVERLAP
+)
+
+# Hot indexes: session_id -> (version, SessionIndex)
+_index_cache = LRUCache(maxsize=settings.PDF_INDEX_CACHE_SIZE)
+
+# Attempts at an index update before giving up on concurrent writers
+MAX_UPDATE_ATTEMPTS = 5
+
+
+def content_hash(text: str) -> str:
+    """
+    SHA-256 of the extracted PDF text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_ids(text_hash: str, count: int) -> list[str]:
+    return [f"{text_hash[:16]}-{i}" for i in range(count)]
+
+
+class SessionIndex:
+    """
+    Dense (FAISS) and sparse (BM25) indexes over the chunks of all of a
+    session's documents, the chunk ids of each document and its filename
+    """
+
+    def __init__(self, vector_store: FAISS | None = None,
+                 bm25: BM25Index | None = None,
+                 documents: dict | None = None,
+                 filenames: dict | None = None):
+        self.vector_store = vector_store
+        self.bm25 = bm25 or BM25Index()
+        self.documents = documents or {}
+        self.filenames = filenames or {}
+        self._positions = None
+        self._order = None
+
+    def copy(self) -> "SessionIndex":
+        """
+        A copy to update while readers go on using this one
+        """
+        vector_store = self.vector_store
+        if vector_store is not None:
+            vector_store = FAISS(
+                get_embeddings(), faiss.clone_index(vector_store.index),
+                InMemoryDocstore(dict(vector_store.docstore._dict)),
+                dict(vector_store.index_to_docstore_id))
+        return SessionIndex(vector_store, self.bm25.copy(),
+                            dict(self.documents), dict(self.filenames))
+
+    def positions(self) -> dict:
+        """
+        FAISS row of each chunk id
+        """
+        if self._positions is None:
+            self._positions = {
+                chunk_id: i for i, chunk_id in
+                self.vector_store.index_to_docstore_id.items()}
+        return self._positions
+
+    def chunk_order(self) -> dict:
+        """
+        (document number, chunk number) of each chunk id, by place in
+        the session and in its document
+        """
+        if self._order is None:
+            self._order = {
+                chunk_id: (d, n)
+                for d, doc_ids in enumerate(self.documents.values())
+                for n, chunk_id in enumerate(doc_ids)}
+        return self._order
+
+    def chunks(self) -> list[Document]:
+        """
+        Every chunk of the session's documents, in document order
+        """
+        docstore = self.vector_store.docstore
+        return [docstore.search(chunk_id)
+                for doc_ids in self.documents.values()
+                for chunk_id in doc_ids]
+
+
+def _assemble(entries: dict, indexed: dict) -> SessionIndex:
+    """
+    A session's indexes built from its documents' chunks and vectors in
+    the content store. `entries` maps content hash to filename; documents
+    without vectors of the current model are left out and get indexed
+    again on use.
+    """
+    session_index = SessionIndex()
+    docs, ids, matrices = {}, [], []
+    for text_hash, filename in entries.items():
+        if text_hash not in indexed:
+            continue
+        chunks, terms, vectors = indexed[text_hash]
+        doc_ids = chunk_ids(text_hash, len(chunks))
+        metadata = {"content_hash": text_hash, "filename": filename}
+        for chunk_id, chunk, counts in zip(doc_ids, chunks, terms):
+            docs[chunk_id] = Document(
+                id=chunk_id, page_content=chunk, metadata=dict(metadata))
+            session_index.bm25.add(chunk_id, counts)
+        ids.extend(doc_ids)
+        matrices.append(vectors)
+        session_index.documents[text_hash] = doc_ids
+        session_index.filenames[text_hash] = filename
+
+    if ids:
+        index = faiss.IndexFlatL2(matrices[0].shape[1])
+        index.add(np.vstack(matrices))
+        session_index.vector_store = FAISS(
+            get_embeddings(), index, InMemoryDocstore(docs),
+            dict(enumerate(ids)))
+    return session_index
+
+
+async def _build(doc: dict | None) -> SessionIndex:
+    """
+    A freshly built copy of the indexes an index document records
+    """
+    if doc is None:
+        return SessionIndex()
+    entries = doc.get("documents", {})
+    indexed = await load_indexed(list(entries), get_embeddings().model_id)
+    return await run_blocking(_assemble, entries, indexed)
+
+
+async def _update_index(session_id: str, mutate):
+    """
+    Apply `mutate(session_index)` to the session's indexes and save which
+    documents they hold; chunks and vectors live in the content store.
+    The update starts from a copy of the hot cached indexes when they
+    are current. Writers on other workers are detected by the version
+    number; the update is then replayed on the indexes they saved.
+    """
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        doc = await pdf_indexes_collection.find_one({"_id": session_id})
+        cached = _index_cache.get(session_id)
+        if doc is not None and cached and cached[0] == doc["version"]:
+            session_index = await run_blocking(cached[1].copy)
+        else:
+            session_index = await _build(doc)
+        mutate(session_index)
+        fields = {
+            "session_id": session_id,
+            "documents": session_index.filenames,
+            "updated_at": datetime.utcnow()
+        }
+
+        if doc is None:
+            try:
+                await pdf_indexes_collection.insert_one(
+                    {"_id": session_id, "version": 1, **fields})
+            except DuplicateKeyError:
+                continue
+            version = 1
+        else:
+            version = doc["version"] + 1
+            result = await pdf_indexes_collection.update_one(
+                {"_id": session_id, "version": doc["version"]},
+                {"$set": {**fields, "version": version}}
+            )
+            if result.matched_count == 0:
+                continue
+
+        _index_cache[session_id] = (version, session_index)
+        return session_index
+
+    raise RuntimeError(f"PDF index of session {session_id} is busy")
+
+
+async def add_document(session_id: str, text_hash: str, text: str,
+                       filename: str) -> int:
+    """
+    Add one document to the session's dense and sparse indexes. Its
+    chunks and vectors come from the content store when any session
+    indexed the same document before; otherwise it is chunked, embedded
+    and stored there. Documents already indexed are skipped. Returns the
+    number of chunks added.
+    """
+    session_index = await get_index(session_id)
+    if text_hash in session_index.documents:
+        return 0
+
+    model_id = get_embeddings().model_id
+    indexed = (await load_indexed([text_hash], model_id)).get(text_hash)
+    if indexed:
+        chunks, counts, vectors = indexed
+    else:
+        chunks = await run_blocking(splitter.split_text, text)
+        if not chunks:
+            return 0
+        # Embedding is the slow part; do it before touching the index
+        with span("embedding", chunks=len(chunks)):
+            vectors = np.array(
+                await get_embeddings().aembed_documents(chunks),
+                dtype=np.float32)
+        counts = await run_blocking(lambda: [term_counts(c) for c in chunks])
+        await save_indexed(text_hash, model_id, chunks, counts, vectors)
+
+    doc_ids = chunk_ids(text_hash, len(chunks))
+    metadatas = [{"content_hash": text_hash, "filename": filename}
+                 for _ in chunks]
+
+    def add(session_index):
+        if text_hash in session_index.documents:
+            return
+        pairs = list(zip(chunks, vectors))
+        if session_index.vector_store is None:
+            session_index.vector_store = FAISS.from_embeddings(
+                pairs, get_embeddings(), metadatas=metadatas, ids=doc_ids)
+        else:
+            session_index.vector_store.add_embeddings(
+                pairs, metadatas=metadatas, ids=doc_ids)
+        for chunk_id, terms in zip(doc_ids, counts):
+            session_index.bm25.add(chunk_id, terms)
+        session_index.documents[text_hash] = doc_ids
+        session_index.filenames[text_hash] = filename
+
+    await _update_index(session_id, add)
+    return len(chunks)
+
+
+async def remove_document(session_id: str, text_hash: str):
+    """
+    Delete one document's chunks from the session's indexes
+    """
+    def remove(session_index):
+        session_index.filenames.pop(text_hash, None)
+        doc_ids = session_index.documents.pop(text_hash, None)
+        if not doc_ids or session_index.vector_store is None:
+            return
+        if session_index.documents:
+            session_index.vector_store.delete(doc_ids)
+            session_index.bm25.remove(doc_ids)
+        else:
+            session_index.vector_store = None
+            session_index.bm25 = BM25Index()
+
+    await _update_index(session_id, remove)
+
+
+async def get_index(session_id: str) -> SessionIndex:
+    """
+    The session's indexes over all its documents, from the hot cache when
+    it is current. Read only: updates go through add_document and
+    remove_document.
+    """
+    doc = await pdf_indexes_collection.find_one(
+        {"_id": session_id}, {"version": 1})
+    # Version 0: no index yet
+    version = doc["version"] if doc else 0
+    cached = _index_cache.get(session_id)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with span("pdf_index_load"):
+        doc = await pdf_indexes_collection.find_one({"_id": session_id})
+        session_index = await _build(doc)
+    _index_cache[session_id] = (doc["version"] if doc else 0, session_index)
+    return session_index
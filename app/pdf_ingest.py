@@ -0,0 +1,248 @@
+import asyncio
+import os
+import tempfile
+from contextlib import suppress
+from datetime import datetime
+from fastapi import UploadFile
+from app.core.config import settings
+from app.core.executor import get_pdf_executor, run_blocking
+from app.db.mongo import pdf_documents_collection, sessions_collection
+from app.jobs import JobContext, register_handler
+from app.pdf_extract import count_pages, extract_page_range
+from app.pdf_index import add_document, content_hash, remove_document
+from app.pdf_store import (
+    add_reference, drop_upload, load_pages, read_upload, release_reference,
+    save_upload)
+
+
+async def spool_upload(file: UploadFile) -> dict:
+    """
+    Store an upload where the job processing it can read it from any
+    worker, part by part so the PDF is never held in memory whole. The
+    caller removes it with drop_upload.
+    """
+    return await save_upload(file.read)
+
+
+async def fetch_upload(upload: dict, directory: str | None = None) -> str:
+    """
+    Copy a stored upload to a local temporary file for extraction. The
+    caller removes the returned path.
+    """
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for part in read_upload(upload):
+                await run_blocking(out.write, part)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+async def extract_pages(path: str, on_progress=None) -> list[str]:
+    """
+    Extract page texts in parallel on the PDF process pool. `on_progress`
+    is awaited with (pages_done, page_count) as page batches complete.
+    """
+    page_count = await run_blocking(count_pages, path)
+    pages = [""] * page_count
+    if page_count == 0:
+        return pages
+
+    loop = asyncio.get_running_loop()
+    executor = get_pdf_executor()
+    step = settings.PDF_PAGES_PER_TASK
+
+    async def extract_batch(start):
+        end = min(start + step, page_count)
+        texts = await loop.run_in_executor(
+            executor, extract_page_range, path, start, end)
+        return start, texts
+
+    pages_done = 0
+    for batch in asyncio.as_completed(
+            [extract_batch(start) for start in range(0, page_count, step)]):
+        start, texts = await batch
+        pages[start:start + len(texts)] = texts
+        pages_done += len(texts)
+        if on_progress:
+            await on_progress(pages_done, page_count)
+
+    return pages
+
+
+def join_pages(pages: list[str]) -> str:
+    """
+    Full document text, each page followed by a newline
+    """
+    return "\n".join(pages) + "\n" if pages else ""
+
+
+def document_hashes(session: dict | None) -> list[str]:
+    return [d["content_hash"] for d in (session or {}).get("documents", [])]
+
+
+async def save_document(session_id: str, text_hash: str, filename: str,
+                        pages: list[str]):
+    """
+    Reference a document from a session, storing its pages in the
+    content store unless another session already did
+    """
+    result = await pdf_documents_collection.update_one(
+        {"_id": f"{session_id}:{text_hash}"},
+        {"$setOnInsert": {"session_id": session_id,
+                          "content_hash": text_hash,
+                          "filename": filename,
+                          "page_count": len(pages),
+                          "uploaded_at": datetime.utcnow()}},
+        upsert=True
+    )
+    if result.upserted_id is not None:
+        await add_reference(text_hash, pages)
+
+
+async def list_document(session_id: str, text_hash: str, filename: str,
+                        page_count: int, user_id: str | None = None) -> bool:
+    """
+    List a saved document on the session, creating it for `user_id` if
+    new. Returns False when the session already has a document with this
+    content.
+    """
+    query = {"session_id": session_id}
+    if user_id is not None:
+        # Another user's session fails on the unique session_id index
+        query["user_id"] = user_id
+    now = datetime.utcnow()
+    await sessions_collection.update_one(
+        query, {"$setOnInsert": {"documents": [], "updated_at": now}},
+        upsert=True)
+    result = await sessions_collection.update_one(
+        {"session_id": session_id,
+         "documents.content_hash": {"$ne": text_hash}},
+        {"$push": {"documents": {
+            "content_hash": text_hash,
+            "filename": filename,
+            "page_count": page_count,
+            "uploaded_at": now
+        }},
+         "$set": {"updated_at": now}}
+    )
+    return result.modified_count == 1
+
+
+async def load_document_text(session_id: str, text_hash: str) -> str:
+    ref = await pdf_documents_collection.find_one(
+        {"_id": f"{session_id}:{text_hash}"}, {"_id": 1})
+    if not ref:
+        return ""
+    return join_pages(await load_pages(text_hash) or [])
+
+
+async def delete_document(session_id: str, text_hash: str) -> bool:
+    """
+    Remove one document from a session: its vectors, its entry on the
+    session and its reference to the stored content. Returns False when
+    the session doesn't have it.
+    """
+    result = await sessions_collection.update_one(
+        {"session_id": session_id},
+        {"$pull": {"documents": {"content_hash": text_hash}}}
+    )
+    if result.modified_count == 0:
+        return False
+    await remove_document(session_id, text_hash)
+    ref = await pdf_documents_collection.find_one_and_delete(
+        {"_id": f"{session_id}:{text_hash}"})
+    if ref:
+        await release_reference(text_hash)
+    return True
+
+
+async def migrate_legacy_pdf(session: dict):
+    """
+    Move the single `pdf` subdocument of sessions from before
+    multi-document support into the session's documents
+    """
+    pdf = session.get("pdf")
+    if not pdf:
+        return
+
+    text = pdf.get("content") or ""
+    if text:
+        text_hash = content_hash(text)
+        pages = [text]
+        filename = pdf.get("filename", "document.pdf")
+        await save_document(session["session_id"], text_hash, filename,
+                            pages)
+        await add_document(session["session_id"], text_hash, text, filename)
+        await list_document(session["session_id"], text_hash, filename,
+                            len(pages))
+        session["documents"] = [
+            *session.get("documents", []),
+            {"content_hash": text_hash, "filename": filename,
+             "page_count": len(pages)}
+        ]
+
+    await sessions_collection.update_one(
+        {"session_id": session["session_id"]}, {"$unset": {"pdf": ""}})
+    session.pop("pdf", None)
+
+
+@register_handler("pdf_upload")
+async def process_pdf_upload(job: JobContext, payload: dict) -> dict:
+    """
+    Background half of a PDF upload: extract the stored upload, add it
+    to the session's documents and (with PDF_EMBED_ON_UPLOAD) to its
+    index. A document the session already has is skipped.
+    """
+    session_id = payload["session_id"]
+    upload = payload["upload"]
+    filename = payload["filename"]
+    path = None
+    finished = False
+    try:
+        async def report(pages_done, page_count):
+            await job.progress(pages_done=pages_done, page_count=page_count)
+
+        async with job.stage("extract"):
+            os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+            path = await fetch_upload(upload, settings.UPLOAD_SPOOL_DIR)
+            pages = await extract_pages(path, on_progress=report)
+            text = join_pages(pages)
+            text_hash = content_hash(text)
+
+        session = await sessions_collection.find_one(
+            {"session_id": session_id},
+            {"user_id": 1, "documents.content_hash": 1})
+        user_id = payload.get("user_id")
+        if session and user_id and session.get("user_id") != user_id:
+            raise PermissionError("Session belongs to another user")
+        if text_hash in document_hashes(session):
+            finished = True
+            return {"pages": len(pages), "content_hash": text_hash,
+                    "skipped": True}
+
+        async with job.stage("store"):
+            await save_document(session_id, text_hash, filename, pages)
+
+        chunks = 0
+        if settings.PDF_EMBED_ON_UPLOAD:
+            async with job.stage("index"):
+                chunks = await add_document(
+                    session_id, text_hash, text, filename)
+
+        await list_document(session_id, text_hash, filename, len(pages),
+                            user_id)
+
+        finished = True
+        return {"pages": len(pages), "content_hash": text_hash,
+                "chunks": chunks, "skipped": False}
+
+    finally:
+        if path is not None:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+        # Keep the upload while the job may still be retried
+        if finished or job.is_last_attempt:
+            await drop_upload(upload)
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import uuid
+import zlib
+from datetime import datetime
+import numpy as np
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.db.mongo import pdf_blobs_collection, pdf_contents_collection
+
+try:
+    import zstandard
+except ImportError:  # optional; payloads are then zlib-compressed
+    zstandard = None
+
+# Payloads above this are split into pdf_blobs parts so a content
+# document stays well under MongoDB's 16 MB limit
+BLOB_PART_BYTES = 4 * 1024 * 1024
+
+
+def _compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(
+            level=settings.PDF_STORE_ZSTD_LEVEL)
+        return "zstd", compressor.compress(data)
+    return "zlib", zlib.compress(data)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading stored PDF content requires the "
+                               "'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+def _encode_json(value) -> tuple[str, bytes]:
+    return _compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode_json(codec: str, data: bytes):
+    return json.loads(_decompress(codec, data))
+
+
+def _model_key(model_id: str) -> str:
+    # Model ids contain dots, which field names can't
+    return hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16]
+
+
+async def _put_blob(text_hash: str, codec: str, data: bytes) -> dict:
+    """
+    A payload as stored on a content document: inline, or split into
+    parts under an id of its own
+    """
+    if len(data) <= BLOB_PART_BYTES:
+        return {"codec": codec, "data": Binary(data)}
+    blob_id = f"{text_hash}/{uuid.uuid4().hex}"
+    parts = range(0, len(data), BLOB_PART_BYTES)
+    await pdf_blobs_collection.insert_many([
+        {"_id": f"{blob_id}/{n}", "data": Binary(data[i:i + BLOB_PART_BYTES])}
+        for n, i in enumerate(parts)
+    ])
+    return {"codec": codec, "id": blob_id, "parts": len(parts)}
+
+
+async def _get_blob(blob: dict) -> bytes:
+    if "parts" not in blob:
+        return bytes(blob["data"])
+    ids = [f"{blob['id']}/{n}" for n in range(blob["parts"])]
+    docs = await pdf_blobs_collection.find({"_id": {"$in": ids}}).to_list(
+        length=None)
+    data = {doc["_id"]: bytes(doc["data"]) for doc in docs}
+    return b"".join(data[i] for i in ids)
+
+
+async def _drop_blobs(*blobs: dict | None):
+    ids = [f"{blob['id']}/{n}" for blob in blobs if blob and "parts" in blob
+           for n in range(blob["parts"])]
+    if ids:
+        await pdf_blobs_collection.delete_many({"_id": {"$in": ids}})
+
+
+async def save_upload(read) -> dict:
+    """
+    Store an uploaded file, read with `read(size)` until it returns no
+    more bytes, in pdf_blobs parts that a job on any worker can read.
+    Only one part is held in memory at a time. Returns the reference to
+    pass to read_upload and drop_upload.
+    """
+    blob = {"codec": "raw", "id": f"upload/{uuid.uuid4().hex}", "parts": 0}
+    try:
+        while data := await read(BLOB_PART_BYTES):
+            await pdf_blobs_collection.insert_one(
+                {"_id": f"{blob['id']}/{blob['parts']}", "data": Binary(data),
+                 "created_at": datetime.utcnow()})
+            blob["parts"] += 1
+    except BaseException:
+        await _drop_blobs(blob)
+        raise
+    return blob
+
+
+async def read_upload(blob: dict):
+    """
+    The bytes of a stored upload, one part at a time
+    """
+    for n in range(blob["parts"]):
+        doc = await pdf_blobs_collection.find_one({"_id": f"{blob['id']}/{n}"})
+        if doc is None:
+            raise FileNotFoundError(f"Upload {blob['id']} is gone")
+        yield bytes(doc["data"])
+
+
+async def drop_upload(blob: dict):
+    await _drop_blobs(blob)
+
+
+async def add_reference(text_hash: str, pages: list[str]):
+    """
+    Count one more user (a session) of a document, storing its pages the
+    first time the content is seen. Identical documents are stored once.
+    """
+    result = await pdf_contents_collection.update_one(
+        {"_id": text_hash, "pages": {"$exists": True}},
+        {"$inc": {"refs": 1}})
+    if result.matched_count:
+        return
+
+    codec, data = await run_blocking(_encode_json, pages)
+    blob = await _put_blob(text_hash, codec, data)
+    try:
+        await pdf_contents_collection.update_one(
+            {"_id": text_hash},
+            {"$setOnInsert": {"refs": 0, "created_at": datetime.utcnow()}},
+            upsert=True)
+    except DuplicateKeyError:
+        pass  # inserted concurrently
+    result = await pdf_contents_collection.update_one(
+        {"_id": text_hash, "pages": {"$exists": False}},
+        {"$set": {"pages": blob, "page_count": len(pages),
+                  "size": sum(len(page) for page in pages)}})
+    if not result.modified_count:
+        await _drop_blobs(blob)
+    await pdf_contents_collection.update_one(
+        {"_id": text_hash}, {"$inc": {"refs": 1}})
+
+
+async def release_reference(text_hash: str):
+    """
+    Count one user less, deleting the content with its last user
+    """
+    await pdf_contents_collection.update_one(
+        {"_id": text_hash}, {"$inc": {"refs": -1}})
+    doc = await pdf_contents_collection.find_one_and_delete(
+        {"_id": text_hash, "refs": {"$lte": 0}})
+    if doc:
+        await _drop_blobs(doc.get("pages"), doc.get("chunks"),
+                          doc.get("terms"),
+                          *(doc.get("vectors") or {}).values())
+
+
+async def load_pages(text_hash: str) -> list[str] | None:
+    doc = await pdf_contents_collection.find_one(
+        {"_id": text_hash}, {"pages": 1})
+    if not doc or not doc.get("pages"):
+        return None
+    blob = doc["pages"]
+    return await run_blocking(_decode_json, blob["codec"],
+                              await _get_blob(blob))
+
+
+async def save_indexed(text_hash: str, model_id: str, chunks: list[str],
+                       terms: list[dict], vectors: np.ndarray):
+    """
+    Keep a document's chunks, their BM25 term counts and their vectors
+    under `model_id`, so any session adding the same document skips
+    chunking and embedding
+    """
+    model_key = _model_key(model_id)
+    key = f"vectors.{model_key}"
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    def encode():
+        return (_encode_json(chunks), _encode_json(terms), vectors.tobytes())
+
+    (chunk_codec, chunk_data), (term_codec, term_data), vector_data = \
+        await run_blocking(encode)
+
+    try:
+        await pdf_contents_collection.update_one(
+            {"_id": text_hash},
+            {"$setOnInsert": {"refs": 0, "created_at": datetime.utcnow()}},
+            upsert=True)
+    except DuplicateKeyError:
+        pass
+
+    doc = await pdf_contents_collection.find_one(
+        {"_id": text_hash}, {"chunks": 1, key: 1})
+    if not doc.get("chunks"):
+        chunk_blob = await _put_blob(text_hash, chunk_codec, chunk_data)
+        term_blob = await _put_blob(text_hash, term_codec, term_data)
+        result = await pdf_contents_collection.update_one(
+            {"_id": text_hash, "chunks": {"$exists": False}},
+            {"$set": {"chunks": chunk_blob, "terms": term_blob}})
+        if not result.modified_count:
+            await _drop_blobs(chunk_blob, term_blob)
+
+    if model_key not in doc.get("vectors", {}):
+        vector_blob = await _put_blob(text_hash, "raw", vector_data)
+        vector_blob.update(model=model_id, dim=int(vectors.shape[1]))
+        result = await pdf_contents_collection.update_one(
+            {"_id": text_hash, key: {"$exists": False}},
+            {"$set": {key: vector_blob}})
+        if not result.modified_count:
+            await _drop_blobs(vector_blob)
+
+
+async def load_indexed(text_hashes: list[str], model_id: str) -> dict:
+    """
+    Chunks, term counts and `model_id` vectors of the documents indexed
+    before, as content hash -> (chunks, terms, float32 matrix)
+    """
+    model_key = _model_key(model_id)
+    key = f"vectors.{model_key}"
+    cursor = pdf_contents_collection.find(
+        {"_id": {"$in": text_hashes}, key: {"$exists": True}},
+        {"chunks": 1, "terms": 1, key: 1})
+    indexed = {}
+    async for doc in cursor:
+        chunk_blob, term_blob = doc["chunks"], doc["terms"]
+        vector_blob = doc["vectors"][model_key]
+        chunk_data = await _get_blob(chunk_blob)
+        term_data = await _get_blob(term_blob)
+        vector_data = await _get_blob(vector_blob)
+
+        def decode():
+            return (_decode_json(chunk_blob["codec"], chunk_data),
+                    _decode_json(term_blob["codec"], term_data),
+                    np.frombuffer(vector_data, np.float32).reshape(
+                        -1, vector_blob["dim"]))
+
+        indexed[doc["_id"]] = await run_blocking(decode)
+    return indexed
@@ -0,0 +1,155 @@
+import math
+import re
+from collections import Counter
+import numpy as np
+from app.core.config import settings
+from app.llm_factory import get_embeddings
+
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from has have how i in is it "
+    "its me my of on or that the this to was were what when where which "
+    "who why will with you your".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased word tokens without stopwords, plural "s" stripped
+    """
+    terms = []
+    for word in re.findall(r"\w+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunks, kept as an inverted index so a query only
+    touches the chunks sharing a term with it
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {chunk_id: term frequency}
+        self.lengths = {}   # chunk_id -> number of terms
+        self.total_length = 0
+
+    def add(self, chunk_id: str, terms: dict):
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        length = sum(terms.values())
+        self.lengths[chunk_id] = length
+        self.total_length += length
+
+    def copy(self) -> "BM25Index":
+        index = BM25Index(self.k1, self.b)
+        index.postings = {term: dict(chunks)
+                          for term, chunks in self.postings.items()}
+        index.lengths = dict(self.lengths)
+        index.total_length = self.total_length
+        return index
+
+    def remove(self, chunk_ids: list[str]):
+        removed = set(chunk_ids) & self.lengths.keys()
+        for chunk_id in removed:
+            self.total_length -= self.lengths.pop(chunk_id)
+        for term in list(self.postings):
+            chunks = self.postings[term]
+            for chunk_id in removed & chunks.keys():
+                del chunks[chunk_id]
+            if not chunks:
+                del self.postings[term]
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        avg_length = self.total_length / count
+        scores = {}
+        for term in set(tokenize(query)):
+            chunks = self.postings.get(term)
+            if not chunks:
+                continue
+            idf = math.log(1 + (count - len(chunks) + 0.5) /
+                           (len(chunks) + 0.5))
+            for chunk_id, tf in chunks.items():
+                norm = self.k1 * (1 - self.b + self.b *
+                                  self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] = (scores.get(chunk_id, 0.0) +
+                                    idf * tf * (self.k1 + 1) / (tf + norm))
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def term_counts(text: str) -> dict:
+    return dict(Counter(tokenize(text)))
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]],
+                           k: int) -> list[tuple[str, float]]:
+    """
+    Merge ranked id lists; an id scores 1 / (k + rank) in each list
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def mmr_select(scores: list[float], vectors: np.ndarray, k: int,
+               lambda_mult: float) -> list[int]:
+    """
+    Maximal marginal relevance over fused candidates: relevance is the
+    fused score, redundancy the cosine similarity to chunks already
+    picked. Returns candidate positions in pick order.
+    """
+    relevance = np.array(scores) / max(scores)
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = vectors @ vectors.T
+    picked = [0]
+    while len(picked) < min(k, len(scores)):
+        redundancy = similarity[:, picked].max(axis=1)
+        marginal = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        marginal[picked] = -np.inf
+        picked.append(int(marginal.argmax()))
+    return picked
+
+
+async def hybrid_search(session_index, query: str, k: int | None = None,
+                        mmr: bool | None = None) -> list:
+    """
+    Top chunks of a session for a query: dense FAISS and sparse BM25
+    candidates merged by reciprocal rank fusion, optionally diversified
+    with maximal marginal relevance
+    """
+    k = k or settings.RETRIEVAL_K
+    mmr = settings.RETRIEVAL_MMR if mmr is None else mmr
+    fetch_k = max(k, settings.RETRIEVAL_FETCH_K)
+    vector_store = session_index.vector_store
+
+    query_vector = np.array(await get_embeddings().aembed_query(query),
+                            dtype="float32")
+    _, hits = vector_store.index.search(query_vector.reshape(1, -1), fetch_k)
+    dense_ids = [vector_store.index_to_docstore_id[int(i)]
+                 for i in hits[0] if i != -1]
+    sparse_ids = [chunk_id for chunk_id, _ in
+                  session_index.bm25.search(query, fetch_k)]
+    fused = reciprocal_rank_fusion(
+        [dense_ids, sparse_ids], settings.RETRIEVAL_RRF_K)
+
+    if mmr and len(fused) > k:
+        positions = session_index.positions()
+        vectors = np.array([
+            vector_store.index.reconstruct(positions[chunk_id])
+            for chunk_id, _ in fused])
+        picked = mmr_select([score for _, score in fused], vectors, k,
+                            settings.RETRIEVAL_MMR_LAMBDA)
+        chunk_ids = [fused[i][0] for i in picked]
+    else:
+        chunk_ids = [chunk_id for chunk_id, _ in fused[:k]]
+
+    return [vector_store.docstore.search(chunk_id) for chunk_id in chunk_ids]
@@ -0,0 +1,94 @@
+import re
+import time
+from collections import OrderedDict
+import faiss
+import numpy as np
+from app.core.config import settings
+from app.llm_factory import get_embeddings
+
+# Inputs that refer to the user or the conversation; their answers
+# depend on the session and are never shared
+_PERSONAL = re.compile(
+    r"\b(i|i'm|i've|me|my|mine|myself|we|us|our|you said|earlier|"
+    r"previous|above|again|that|this|it|they|them)\b",
+    re.IGNORECASE
+)
+
+
+def is_context_free(user_input: str) -> bool:
+    return not _PERSONAL.search(user_input)
+
+
+class SemanticCache:
+    """
+    Answers keyed by input embedding, served for any input whose cosine
+    similarity to a cached one reaches the threshold. Entries live in
+    per-scope FAISS indexes ("chat", or a PDF content hash) and expire
+    after a TTL; the least recently used are evicted past maxsize.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._next_id = 0
+        # id -> (scope, expires_at, answer), least recently used first
+        self._entries = OrderedDict()
+        self._indexes = {}
+
+    async def embed(self, text: str) -> np.ndarray:
+        vector = np.array([await get_embeddings().aembed_query(text)],
+                          dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(self, scope: str, vector: np.ndarray) -> str | None:
+        index = self._indexes.get(scope)
+        if index is not None:
+            scores, ids = index.search(vector, min(4, index.ntotal))
+            for score, entry_id in zip(scores[0], ids[0]):
+                if score < self.threshold:
+                    break
+                _, expires_at, answer = self._entries[int(entry_id)]
+                if expires_at < time.monotonic():
+                    self._remove(int(entry_id))
+                    continue
+                self._entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return answer
+        self.misses += 1
+        return None
+
+    def store(self, scope: str, vector: np.ndarray, answer: str):
+        index = self._indexes.get(scope)
+        if index is None:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            self._indexes[scope] = index
+
+        entry_id = self._next_id
+        self._next_id += 1
+        index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+        self._entries[entry_id] = (scope, time.monotonic() + self.ttl, answer)
+
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        scope, _, _ = self._entries.pop(entry_id)
+        index = self._indexes[scope]
+        index.remove_ids(np.array([entry_id], dtype="int64"))
+        if index.ntotal == 0:
+            del self._indexes[scope]
+
+    def stats(self) -> dict:
+        return {"backend": "faiss", "hits": self.hits, "misses": self.misses,
+                "size": len(self._entries), "scopes": len(self._indexes)}
+
+
+semantic_cache = SemanticCache(
+    maxsize=settings.SEMANTIC_CACHE_SIZE,
+    ttl=settings.SEMANTIC_CACHE_TTL_SECONDS,
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD
+)
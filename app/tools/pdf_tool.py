@@ -1,19 +1,13 @@
+import logging
 from langchain.tools import tool
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.chains.question_answering import load_qa_chain
-from langchain_openai import ChatOpenAI
-import os
+from app.context_packing import pdf_qa_tokens, prepare_context
+from app.core.metrics import TokenUsageHandler
 from app.db.mongo import sessions_collection
+from app.llm_factory import get_qa_chain
+from app.pdf_index import add_document, get_index
+from app.pdf_ingest import load_document_text
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0.7,
-    api_key=OPENAI_API_KEY
-)
+logger = logging.getLogger(__name__)
 
 
 @tool("pdf_qa")
@@ -33,50 +27,60 @@ def pdf_qa_tool(question: str) -> str:
 class PDFQATool:
     def __init__(self, session_id):
         self.session_id = session_id
+        # Whether the last run answered from the documents, rather than
+        # reporting an error or missing content
+        self.answered = False
 
-    async def run(self, question: str) -> str:
-        """Run the PDF QA tool with the stored session_id"""
+    async def run(self, question: str, callbacks: list | None = None) -> str:
+        """Run the PDF QA tool over every document of the session"""
+        self.answered = False
         try:
-            session = await sessions_collection.find_one({"session_id": self.session_id})
-            if not session or not session.get("pdf") or not session["pdf"].get("content"):
+            session = await sessions_collection.find_one(
+                {"session_id": self.session_id}, {"documents": 1})
+            documents = (session or {}).get("documents", [])
+            if not documents:
                 return "No PDF content available. Please upload a PDF first."
 
-            pdf_content = session["pdf"]["content"]
-
-            if not pdf_content or pdf_content.strip() == "":
-                return "No PDF content available. Please upload a PDF first."
-
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=50
-            )
-            chunks = splitter.split_text(pdf_content)
-
-            if not chunks:
+            session_index = await get_index(self.session_id)
+
+            # Documents stored without an index (PDF_EMBED_ON_UPLOAD off)
+            missing = [d for d in documents
+                       if d["content_hash"] not in session_index.documents]
+            for document in missing:
+                text = await load_document_text(
+                    self.session_id, document["content_hash"])
+                if text.strip():
+                    await add_document(self.session_id,
+                                       document["content_hash"], text,
+                                       document["filename"])
+            if missing:
+                session_index = await get_index(self.session_id)
+
+            if session_index.vector_store is None:
                 return "PDF content is empty or could not be processed."
 
-            embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-            vector_store = FAISS.from_texts(chunks, embeddings)
-
-            if any(keyword in question.lower() for keyword in ['skill', 'technology', 'programming', 'language', 'tool']):
-                search_query = "skills technologies programming languages tools frameworks experience"
-            elif any(keyword in question.lower() for keyword in ['experience', 'job', 'work', 'position']):
-                search_query = "experience work job position employment history"
-            elif any(keyword in question.lower() for keyword in ['education', 'degree', 'school', 'university']):
-                search_query = "education degree school university college qualification"
-            else:
-                search_query = question
-
-            relevant_docs = vector_store.similarity_search(search_query, k=4)
+            usage = TokenUsageHandler()
+            relevant_docs, context_tokens, mode = await prepare_context(
+                session_index, question, map_callbacks=[usage])
 
             if not relevant_docs:
                 return "I couldn't find relevant information in the PDF to answer your question."
 
-            qa_chain = load_qa_chain(llm, chain_type="stuff")
-            answer = qa_chain.run(
-                input_documents=relevant_docs, question=question)
+            result = await get_qa_chain().ainvoke(
+                {"input_documents": relevant_docs, "question": question},
+                config={"callbacks": [*(callbacks or []), usage]}
+            )
+
+            pdf_qa_tokens.observe(context_tokens, kind="context")
+            pdf_qa_tokens.observe(usage.input_tokens, kind="input")
+            pdf_qa_tokens.observe(usage.output_tokens, kind="output")
+            logger.info(
+                "PDF answer (%s): %d passages, %d context tokens, "
+                "%d tokens in, %d tokens out", mode, len(relevant_docs),
+                context_tokens, usage.input_tokens, usage.output_tokens)
 
-            return answer
+            self.answered = True
+            return result["output_text"]
 
         except Exception as e:
             return f"Error processing your PDF question: {str(e)}"
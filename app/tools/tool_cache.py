@@ -0,0 +1,106 @@
+import functools
+import hashlib
+import re
+import time
+from datetime import datetime, timedelta
+from app.core.cache import SingleFlight, get_cache
+from app.core.config import settings
+from app.db.mongo import tool_cache_collection
+
+# Per-tool counters, see tool_cache_stats
+_stats = {}
+_single_flight = SingleFlight()
+
+
+async def ensure_tool_cache_indexes():
+    # Mongo drops persisted results once they expire
+    await tool_cache_collection.create_index(
+        "expires_at", expireAfterSeconds=0)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case- and whitespace-insensitive form of a tool query
+    """
+    return re.sub(r"\s+", " ", query).strip().strip("?.!").lower()
+
+
+def cached_tool_call(tool_name: str, ttl: float):
+    """
+    Cache an async `fetch(query) -> str` by normalized query: hot results
+    in the shared tool cache, optionally Mongo behind it, and concurrent
+    identical queries coalesced into one upstream call. Exceptions are
+    never cached.
+    """
+    def decorator(fetch):
+        cache = get_cache(f"tool:{tool_name}",
+                          maxsize=settings.TOOL_CACHE_SIZE, ttl=ttl)
+        stats = _stats.setdefault(tool_name, {
+            "hits": 0, "misses": 0, "persisted_hits": 0, "coalesced": 0,
+            "upstream_calls": 0, "upstream_seconds": 0.0
+        })
+
+        async def load_or_fetch(key, query):
+            if settings.TOOL_CACHE_PERSIST:
+                doc = await tool_cache_collection.find_one(
+                    {"_id": f"{tool_name}:{key}",
+                     "expires_at": {"$gt": datetime.utcnow()}})
+                if doc:
+                    await cache.set(key, doc["value"])
+                    stats["persisted_hits"] += 1
+                    return doc["value"]
+
+            start = time.perf_counter()
+            value = await fetch(query)
+            stats["upstream_calls"] += 1
+            stats["upstream_seconds"] += time.perf_counter() - start
+
+            await cache.set(key, value)
+            if settings.TOOL_CACHE_PERSIST:
+                await tool_cache_collection.update_one(
+                    {"_id": f"{tool_name}:{key}"},
+                    {"$set": {"value": value,
+                              "expires_at": datetime.utcnow() +
+                              timedelta(seconds=ttl)}},
+                    upsert=True
+                )
+            return value
+
+        @functools.wraps(fetch)
+        async def wrapper(query: str) -> str:
+            key = hashlib.sha1(
+                normalize_query(query).encode("utf-8")).hexdigest()
+            value = await cache.get(key)
+            if value is not None:
+                stats["hits"] += 1
+                return value
+
+            stats["misses"] += 1
+            value, shared = await _single_flight.do(
+                f"{tool_name}:{key}", lambda: load_or_fetch(key, query))
+            if shared:
+                stats["coalesced"] += 1
+            return value
+
+        return wrapper
+    return decorator
+
+
+def tool_cache_stats() -> dict:
+    """
+    Hit rate and estimated upstream time saved per tool
+    """
+    report = {}
+    for tool_name, stats in _stats.items():
+        lookups = stats["hits"] + stats["misses"]
+        avoided = (stats["hits"] + stats["persisted_hits"] +
+                   stats["coalesced"])
+        avg_upstream = (stats["upstream_seconds"] / stats["upstream_calls"]
+                        if stats["upstream_calls"] else 0.0)
+        report[tool_name] = {
+            **stats,
+            "hit_rate": round(avoided / lookups, 4) if lookups else 0.0,
+            "avg_upstream_seconds": round(avg_upstream, 4),
+            "upstream_seconds_saved": round(avoided * avg_upstream, 3),
+        }
+    return report
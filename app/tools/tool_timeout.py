@@ -0,0 +1,29 @@
+import asyncio
+from langchain_core.tools import BaseTool, StructuredTool
+from app.core.metrics import span
+
+
+def with_timeout(base_tool: BaseTool, seconds: float) -> BaseTool:
+    """
+    Same tool, but a call slower than `seconds` returns a notice instead
+    of holding up the agent, so answers can be built from the tools that
+    did respond
+    """
+    async def run(*args, **kwargs) -> str:
+        # ReAct passes the raw input string, tool calling passes arguments
+        tool_input = args[0] if args else kwargs
+        try:
+            with span(f"tool.{base_tool.name}"):
+                return await asyncio.wait_for(
+                    base_tool.ainvoke(tool_input), seconds)
+        except asyncio.TimeoutError:
+            return (f"{base_tool.name} did not respond within {seconds:g}s; "
+                    "answer with the other results.")
+
+    return StructuredTool.from_function(
+        coroutine=run,
+        name=base_tool.name,
+        description=base_tool.description,
+        args_schema=base_tool.args_schema,
+        return_direct=base_tool.return_direct
+    )
@@ -1,5 +1,7 @@
-import requests
 from langchain.tools import tool
+from app.core.config import settings
+from app.core.http import get_http_client
+from app.tools.tool_cache import cached_tool_call
 from dotenv import load_dotenv
 import os
 
@@ -9,46 +11,55 @@ SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 # This is web search tool used SerpAPI
 
 
-@tool("web_search", return_direct=False)
-def web_search(query: str) -> str:
+@cached_tool_call("web_search", ttl=settings.WEB_SEARCH_CACHE_TTL_SECONDS)
+async def search_serpapi(query: str) -> str:
     """
-    Perform a Google search via SerpAPI and return top 3 results.
+    Top 3 Google results for a query via SerpAPI, formatted. Raises on
+    HTTP errors so failures are not cached.
     """
-    if not SERPAPI_API_KEY:
-        return "SerpAPI API key not configured."
-
-    url = "https://serpapi.com/search.json"
+    url = settings.SERPAPI_URL
     params = {
         "q": query,
         "api_key": SERPAPI_API_KEY,
         "num": 3
     }
 
+    resp = await get_http_client().get(url, params=params)
+    resp.raise_for_status()
+    data = resp.json()
+
+    results = []
+    for item in data.get("organic_results", [])[:3]:
+        results.append({
+            "title": item.get("title"),
+            "link": item.get("link"),
+            "snippet": item.get("snippet")
+        })
+
+    if not results:
+        return "No search results found."
+
+    formatted_results = []
+    for i, result in enumerate(results, 1):
+        formatted_results.append(
+            f"{i}. {result['title']}\n"
+            f"   URL: {result['link']}\n"
+            f"   Snippet: {result['snippet']}\n"
+        )
+
+    return "\n".join(formatted_results)
+
+
+@tool("web_search", return_direct=False)
+async def web_search(query: str) -> str:
+    """
+    Perform a Google search via SerpAPI and return top 3 results.
+    """
+    if not SERPAPI_API_KEY:
+        return "SerpAPI API key not configured."
+
     try:
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-
-        results = []
-        for item in data.get("organic_results", [])[:3]:
-            results.append({
-                "title": item.get("title"),
-                "link": item.get("link"),
-                "snippet": item.get("snippet")
-            })
-
-        if not results:
-            return "No search results found."
-
-        formatted_results = []
-        for i, result in enumerate(results, 1):
-            formatted_results.append(
-                f"{i}. {result['title']}\n"
-                f"   URL: {result['link']}\n"
-                f"   Snippet: {result['snippet']}\n"
-            )
-
-        return "\n".join(formatted_results)
+        return await search_serpapi(query)
 
     except Exception as e:
         return f"Search error: {str(e)}"
@@ -0,0 +1,105 @@
+"""
+Per-request overhead of building the chat agent and PDF QA chain,
+excluding LLM time.
+
+"rebuild" constructs everything per request the way get_bot_response
+and PDFQATool used to (initialize_agent, a new embeddings client and
+load_qa_chain). "factory" binds memory to the shared agent from
+app.llm_factory. "invoke" additionally runs one agent turn against a
+fake chat model that answers instantly.
+
+    python -m benchmarks.bench_agent_overhead --iterations 500
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain.agents import AgentType, initialize_agent  # noqa: E402
+from langchain.chains.question_answering import load_qa_chain  # noqa: E402
+from langchain.memory import ConversationBufferMemory  # noqa: E402
+from langchain_core.language_models.fake_chat_models import (  # noqa: E402
+    FakeListChatModel)
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings  # noqa: E402
+from app import llm_factory  # noqa: E402
+
+ANSWER = "Thought: Do I need to use a tool? No\nAI: hello"
+
+
+def new_memory():
+    return ConversationBufferMemory(memory_key="chat_history")
+
+
+def rebuild(llm):
+    initialize_agent(
+        tools=llm_factory.AGENT_TOOLS,
+        llm=llm,
+        agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
+        memory=new_memory(),
+        verbose=False,
+        handle_parsing_errors=True
+    )
+    OpenAIEmbeddings(api_key="sk-benchmark")
+    load_qa_chain(llm, chain_type="stuff")
+
+
+def factory(llm):
+    llm_factory.build_agent_executor(new_memory())
+    llm_factory.get_embeddings()
+    llm_factory.get_qa_chain()
+
+
+def timed(func, llm, iterations):
+    func(llm)  # warm imports and caches
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(llm)
+    return (time.perf_counter() - start) / iterations
+
+
+async def timed_invoke(build, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        executor = build()
+        await executor.ainvoke({"input": "hi"})
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    llm = ChatOpenAI(model=llm_factory.CHAT_MODEL_NAME, api_key="sk-benchmark")
+    rebuild_s = timed(rebuild, llm, args.iterations)
+
+    fake = FakeListChatModel(responses=[ANSWER])
+    llm_factory.get_chat_model = lambda: fake
+    factory_s = timed(factory, fake, args.iterations)
+
+    def build_rebuilt():
+        return initialize_agent(
+            tools=llm_factory.AGENT_TOOLS, llm=fake,
+            agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
+            memory=new_memory(), handle_parsing_errors=True)
+
+    def build_shared():
+        return llm_factory.build_agent_executor(new_memory())
+
+    invoke_rebuild_s = asyncio.run(timed_invoke(build_rebuilt, args.iterations))
+    invoke_factory_s = asyncio.run(timed_invoke(build_shared, args.iterations))
+
+    print(f"{'':<22}{'rebuild ms':>12}{'factory ms':>12}{'speedup':>9}")
+    for label, before, after in (
+            ("construction", rebuild_s, factory_s),
+            ("construction+invoke", invoke_rebuild_s, invoke_factory_s)):
+        print(f"{label:<22}{before * 1000:>12.3f}{after * 1000:>12.3f}"
+              f"{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+/chat/send latency while a burst of logins is running, with bcrypt
+inline on the event loop ("before") and on the password pool ("after").
+
+The app runs in-process over httpx's ASGI transport. The agent is a stub
+that sleeps for --llm-latency seconds, and users live in memory, so the
+numbers isolate event-loop blocking from network and LLM cost. Only
+chats answered with 200 are timed; the others are counted as errors.
+
+    python -m benchmarks.bench_login_concurrency --logins 32 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+# One benchmark user sends every request; per-user limits would turn
+# most of them into 429s
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+from app.main import create_application  # noqa: E402
+from app.api.v1 import auth, chat  # noqa: E402
+from app.auth_utils import hash_password, verify_password  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+class MemoryUsers:
+    """
+    The two users_collection calls the login path makes
+    """
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, *args, **kwargs):
+        return self.docs.get(query.get("email"))
+
+    async def insert_one(self, doc):
+        doc["_id"] = str(len(self.docs) + 1)
+        self.docs[doc["email"]] = doc
+        return type("Result", (), {"inserted_id": doc["_id"]})()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_mode(mode, args):
+    original = (auth.hash_password_async, auth.verify_password_async)
+    if mode == "before":
+        async def hash_inline(password):
+            return hash_password(password)
+
+        async def verify_inline(password, hashed):
+            return verify_password(password, hashed)
+
+        auth.hash_password_async = hash_inline
+        auth.verify_password_async = verify_inline
+
+    async def fake_bot_response(user_id, session_id, user_input,
+                                callbacks=None):
+        await asyncio.sleep(args.llm_latency)
+        return "ok"
+
+    chat.get_bot_response = fake_bot_response
+    auth.users_collection = MemoryUsers()
+    await auth.users_collection.insert_one(
+        {"email": EMAIL, "hashed_password": hash_password(PASSWORD)})
+
+    app = create_application()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://bench") as client:
+        res = await client.post("/api/v1/auth/login",
+                                json={"email": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        login_status = []
+        chat_latencies = []
+        chat_errors = []
+
+        async def login(delay):
+            await asyncio.sleep(delay)
+            res = await client.post(
+                "/api/v1/auth/login",
+                json={"email": EMAIL, "password": PASSWORD})
+            login_status.append(res.status_code)
+
+        async def chat_worker(deadline):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                res = await client.post("/api/v1/chat/send", headers=headers,
+                                        json={"user_input": "hi"})
+                if res.status_code == 200:
+                    chat_latencies.append(time.perf_counter() - start)
+                else:
+                    chat_errors.append(res.status_code)
+
+        # Logins arrive evenly over the run while chat users keep sending
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *[login(i * args.duration / args.logins)
+              for i in range(args.logins)],
+            *[chat_worker(deadline) for _ in range(args.chat_users)]
+        )
+        elapsed = time.perf_counter() - start
+
+    auth.hash_password_async, auth.verify_password_async = original
+    return {
+        "mode": mode,
+        "elapsed": elapsed,
+        "logins_ok": login_status.count(200),
+        "logins_503": login_status.count(503),
+        "logins_failed": sum(code not in (200, 503) for code in login_status),
+        "p50": percentile(chat_latencies, 50),
+        "p95": percentile(chat_latencies, 95),
+        "p99": percentile(chat_latencies, 99),
+        "chats": len(chat_latencies),
+        "chat_errors": len(chat_errors),
+        "mean": statistics.mean(chat_latencies) if chat_latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds over which logins arrive")
+    parser.add_argument("--chat-users", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'total s':>9}{'login ok':>10}{'login 503':>11}"
+          f"{'login err':>11}{'chats':>7}{'chat err':>10}"
+          f"{'chat p50 ms':>13}{'p95 ms':>9}{'p99 ms':>9}")
+    for mode in ("before", "after"):
+        r = asyncio.run(run_mode(mode, args))
+        print(f"{r['mode']:<8}{r['elapsed']:>9.2f}{r['logins_ok']:>10}"
+              f"{r['logins_503']:>11}{r['logins_failed']:>11}{r['chats']:>7}"
+              f"{r['chat_errors']:>10}{r['p50'] * 1000:>13.1f}"
+              f"{r['p95'] * 1000:>9.1f}{r['p99'] * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Routing accuracy of the chat intent router, and what it saves.
+
+Routes a labelled set of chat turns, disjoint from the router's own
+examples, with:
+
+    legacy       the old substring check: PDF QA when a document is
+                 uploaded and the input mentions it (or "i"/"my" with
+                 "skill", "work", ...), the ReAct agent for the rest
+    rules        the router's patterns alone, the agent for the rest
+                 (the default without EMBEDDING_PROVIDER=local)
+    router       patterns, then embedding similarity (the default with
+                 EMBEDDING_PROVIDER=local)
+
+and prints accuracy per route, the confusion matrix, and the decision
+latency. For turns routed to direct chat it reports the prompt and
+answer-prefix tokens the agent would have spent on top, counted with
+tiktoken on the configured agent prompt, and the time to the first
+answer token they cost at the given model throughput.
+
+Pass your own set with --test-set turns.json, a list of
+{"input": ..., "documents": true/false, "route": "chat"|"pdf"|"agent"}.
+--embeddings hashing (default) needs no model or API key but only
+matches words; use --embeddings configured for the EMBEDDING_PROVIDER
+model.
+
+    python -m benchmarks.eval_intent_router --embeddings configured
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from app import intent_router, llm_factory  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.tokens import count_tokens  # noqa: E402
+from app.intent_router import (  # noqa: E402
+    AGENT, CHAT, PDF, IntentRouter, route_by_rules)
+from benchmarks.eval_retrieval import HashingEmbeddings  # noqa: E402
+
+ROUTES = (CHAT, PDF, AGENT)
+FILENAMES = ["resume_2024.pdf"]
+
+# (input, a document is uploaded, expected route)
+TEST_SET = [
+    ("hi!", False, CHAT),
+    ("Hello there", True, CHAT),
+    ("thank you!", True, CHAT),
+    ("ok thanks", False, CHAT),
+    ("good morning", False, CHAT),
+    ("My name is Priya", False, CHAT),
+    ("what's up?", True, CHAT),
+    ("bye", False, CHAT),
+    ("Can you explain what a closure is in Python?", False, CHAT),
+    ("write a haiku about the sea", False, CHAT),
+    ("How do I sort a dictionary by value?", True, CHAT),
+    ("What is the square root of 144?", False, CHAT),
+    ("tell me something funny", False, CHAT),
+    ("Could you make your previous answer shorter?", True, CHAT),
+    ("what's the difference between TCP and UDP?", False, CHAT),
+    ("help me draft a thank-you note to my manager", False, CHAT),
+    ("explain big O notation like I'm five", False, CHAT),
+    ("what is my name?", False, CHAT),
+    ("What skills does my CV list?", True, PDF),
+    ("summarize the pdf", True, PDF),
+    ("What did I study at university?", True, PDF),
+    ("Which companies have I worked for?", True, PDF),
+    ("how long was I at my previous employer?", True, PDF),
+    ("What tools am I experienced with?", True, PDF),
+    ("what does resume_2024 say about leadership?", True, PDF),
+    ("List my certifications", True, PDF),
+    ("what projects did I lead?", True, PDF),
+    ("What are the conclusions of the report?", True, PDF),
+    ("Give me the key findings of the uploaded paper", True, PDF),
+    ("what degree do I have?", True, PDF),
+    ("Which languages can I program in?", True, PDF),
+    ("what's in the attachment?", True, PDF),
+    ("search for the best laptops of 2025", False, AGENT),
+    ("What's the latest news on the Mars mission?", True, AGENT),
+    ("find papers about transformer efficiency", False, AGENT),
+    ("weather in Tokyo tomorrow", False, AGENT),
+    ("Who won the Champions League final?", False, AGENT),
+    ("what is the current price of gold?", False, AGENT),
+    ("look up reviews of the new Pixel phone", True, AGENT),
+    ("recent research papers on protein folding", False, AGENT),
+    ("What is the population of Canada right now?", False, AGENT),
+    ("Any arxiv papers on quantum error correction?", False, AGENT),
+    ("what happened in the news today?", False, AGENT),
+    ("What time does the Apple event start this year?", False, AGENT),
+    ("Who is the CEO of Microsoft now?", False, AGENT),
+    ("find studies on intermittent fasting", True, AGENT),
+    ("what movies are showing this week?", False, AGENT),
+    ("What is the exchange rate of euro to dollar?", False, AGENT),
+]
+
+
+def legacy_route(user_input: str, has_documents: bool) -> str:
+    # is_pdf_question as get_bot_response used to compute it
+    text = user_input.lower()
+    is_pdf_question = has_documents and (
+        "pdf" in text or "document" in text or "resume" in text or
+        "cv" in text or "upload" in text or
+        any(word in text for word in ['my', 'me', 'i']) and
+        any(word in text
+            for word in ['skill', 'experience', 'education', 'work', 'job'])
+    )
+    return PDF if is_pdf_question else AGENT
+
+
+def rules_route(user_input: str, has_documents: bool) -> str:
+    filenames = FILENAMES if has_documents else []
+    return route_by_rules(user_input, filenames) or AGENT
+
+
+def agent_overhead_tokens(user_input: str) -> tuple[int, int]:
+    """
+    Prompt and completion tokens the agent spends on a small-talk turn
+    beyond a direct call: its prompt (tool descriptions, format
+    instructions) and, for ReAct, the Thought/AI scaffolding before the
+    answer
+    """
+    direct = (count_tokens(llm_factory.DIRECT_CHAT_SYSTEM_PROMPT) +
+              count_tokens(user_input))
+    if settings.AGENT_MODE == "tools":
+        tools = json.dumps([tool.args for tool in llm_factory.AGENT_TOOLS])
+        return (count_tokens(llm_factory.TOOLS_AGENT_SYSTEM_PROMPT) +
+                count_tokens(tools) + count_tokens(user_input) - direct), 0
+    prompt = llm_factory.get_agent().llm_chain.prompt.format(
+        input=user_input, chat_history="", agent_scratchpad="")
+    scaffolding = "Thought: Do I need to use a tool? No\nAI: "
+    return count_tokens(prompt) - direct, count_tokens(scaffolding)
+
+
+def report(name: str, results: list, timings: list):
+    correct = sum(expected == got for _, _, expected, got in results)
+    print(f"\n{name}: accuracy {correct / len(results):.2f} "
+          f"({correct}/{len(results)})")
+    print(f"  {'expected':<10}" + "".join(f"{r:>8}" for r in ROUTES) +
+          f"{'recall':>9}")
+    for expected in ROUTES:
+        row = [got for _, _, e, got in results if e == expected]
+        counts = [row.count(route) for route in ROUTES]
+        recall = counts[ROUTES.index(expected)] / len(row) if row else 0.0
+        print(f"  {expected:<10}" + "".join(f"{c:>8}" for c in counts) +
+              f"{recall:>9.2f}")
+    if timings:
+        timings.sort()
+        p95 = timings[min(len(timings) - 1,
+                          math.ceil(0.95 * len(timings)) - 1)]
+        print(f"  decision p50 {statistics.median(timings) * 1000:.2f} ms, "
+              f"p95 {p95 * 1000:.2f} ms")
+
+
+async def evaluate(test_set: list, repeat: int, prefill_rate: float,
+                   decode_rate: float):
+    legacy = [(i, d, e, legacy_route(i, d)) for i, d, e in test_set]
+    report("legacy", legacy, [])
+
+    rules, timings = [], []
+    for user_input, has_documents, expected in test_set:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            got = rules_route(user_input, has_documents)
+            timings.append(time.perf_counter() - start)
+        rules.append((user_input, has_documents, expected, got))
+    report("rules", rules, timings)
+
+    settings.INTENT_ROUTER_EMBEDDINGS = True
+    router = IntentRouter(intent_router.EXAMPLES, k=settings.INTENT_ROUTER_K,
+                          chat_margin=settings.INTENT_ROUTER_CHAT_MARGIN)
+    await router.warm_up()
+    routed, timings, stages = [], [], {}
+    for user_input, has_documents, expected in test_set:
+        filenames = FILENAMES if has_documents else []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            got, stage = await router.route(user_input, filenames)
+            timings.append(time.perf_counter() - start)
+        stages[stage] = stages.get(stage, 0) + 1
+        routed.append((user_input, has_documents, expected, got))
+    report("router", routed, timings)
+    print("  decided by " + ", ".join(
+        f"{stage} {count}" for stage, count in sorted(stages.items())))
+
+    for user_input, _, expected, got in routed:
+        if expected != got:
+            print(f"  miss: {user_input!r} -> {got}, expected {expected}")
+
+    direct = [i for i, _, e, got in routed if got == CHAT]
+    if direct:
+        overhead = [agent_overhead_tokens(i) for i in direct]
+        prompt = statistics.mean(p for p, _ in overhead)
+        completion = statistics.mean(c for _, c in overhead)
+        # Prompt tokens are processed in parallel, scaffolding tokens are
+        # generated one by one before the first answer token
+        seconds = prompt / prefill_rate + completion / decode_rate
+        print(f"\n{len(direct)}/{len(routed)} turns skip the "
+              f"{settings.AGENT_MODE} agent, each saving {prompt:.0f} prompt "
+              f"and {completion:.0f} completion tokens, about "
+              f"{seconds * 1000:.0f} ms to the first answer token at "
+              f"{prefill_rate:g} prompt and {decode_rate:g} completion "
+              f"tokens/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--test-set")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="timed decisions per turn")
+    parser.add_argument("--embeddings", choices=["hashing", "configured"],
+                        default="hashing")
+    parser.add_argument("--prefill-rate", type=float, default=5000,
+                        help="prompt tokens/s of the chat model")
+    parser.add_argument("--decode-rate", type=float, default=60,
+                        help="completion tokens/s of the chat model")
+    args = parser.parse_args()
+
+    test_set = TEST_SET
+    if args.test_set:
+        with open(args.test_set) as f:
+            test_set = [(t["input"], t["documents"], t["route"])
+                        for t in json.load(f)]
+
+    if args.embeddings == "hashing":
+        embeddings = HashingEmbeddings()
+        intent_router.get_embeddings = lambda: embeddings
+    asyncio.run(evaluate(test_set, args.repeat, args.prefill_rate,
+                         args.decode_rate))
+
+
+if __name__ == "__main__":
+    main()
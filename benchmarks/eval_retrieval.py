@@ -0,0 +1,256 @@
+"""
+Offline recall and latency of PDF retrieval strategies.
+
+Indexes sample documents the way uploads do (same splitter, FAISS plus
+BM25) and asks labelled questions. A question is answered when a chunk
+containing its answer text is retrieved. Compares:
+
+    keyword      the old PDFQATool path: keyword query rewriting, then
+                 FAISS similarity search
+    dense        FAISS similarity search on the question
+    bm25         BM25 alone
+    hybrid       FAISS + BM25, reciprocal rank fusion (the default)
+    hybrid_mmr   hybrid with MMR diversification
+
+The built-in sample is a resume and a technical report. Pass your own
+with --pdf file.pdf ... --questions questions.json, where the JSON is a
+list of {"question": ..., "answer": ...}.
+
+--embeddings hashing (default) uses a hashed bag-of-words model, so no
+model or API key is needed. Its "dense" scores are lexical too; use
+--embeddings configured for the EMBEDDING_PROVIDER model (OpenAI or a
+local ONNX model).
+
+    python -m benchmarks.eval_retrieval --k 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import statistics
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import numpy as np  # noqa: E402
+from langchain.vectorstores import FAISS  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+from app import llm_factory, retrieval  # noqa: E402
+from app.pdf_extract import count_pages, extract_page_range  # noqa: E402
+from app.pdf_index import SessionIndex, splitter  # noqa: E402
+from app.retrieval import BM25Index, hybrid_search, term_counts  # noqa: E402
+
+FILLER = [
+    "The team met weekly to review progress against the roadmap.",
+    "Documentation was kept up to date in the shared wiki.",
+    "Stakeholders were consulted before major changes were made.",
+    "Several internal tools were maintained alongside the main product.",
+    "Work was planned in two week iterations with regular retrospectives.",
+    "Code review was mandatory for every change merged to main.",
+    "Operational runbooks covered the most common failure scenarios.",
+    "Metrics dashboards were reviewed during the weekly operations sync.",
+]
+
+RESUME_SECTIONS = [
+    ("Summary", "Backend engineer with nine years of experience building "
+     "distributed data platforms for logistics companies."),
+    ("Skills", "Languages: Python, Go and Rust. Frameworks: FastAPI, "
+     "Django and gRPC. Databases: PostgreSQL, MongoDB and Cassandra. "
+     "Infrastructure: Kubernetes, Terraform and Kafka."),
+    ("Experience at Northwind Freight", "Senior Engineer from 2019 to "
+     "2024. Led the migration of the shipment tracking service to an "
+     "event-sourced architecture and cut p99 latency from 900 ms to 120 ms."),
+    ("Experience at Contoso Retail", "Software Engineer from 2015 to 2019. "
+     "Built the inventory reconciliation pipeline processing 40 million "
+     "records per night."),
+    ("Education", "Master of Science in Computer Science, University of "
+     "Edinburgh, 2015. Thesis on consistent hashing in peer-to-peer "
+     "storage. Bachelor of Engineering, Delft University of Technology."),
+    ("Projects", "Maintainer of an open source rate limiter library used "
+     "by over 300 companies, written in Go."),
+    ("Certifications", "Certified Kubernetes Administrator since 2021 and "
+     "AWS Solutions Architect Professional."),
+]
+
+REPORT_SECTIONS = [
+    ("Abstract", "We evaluate retrieval augmented generation over "
+     "enterprise manuals and find that hybrid lexical and dense retrieval "
+     "improves answer accuracy by 14 points."),
+    ("Dataset", "The corpus contains 12,400 pages of maintenance manuals "
+     "for industrial compressors, annotated with 1,850 questions."),
+    ("Method", "Chunks of 1,000 characters are embedded with a sentence "
+     "encoder and indexed alongside an Okapi BM25 inverted index."),
+    ("Results", "Reciprocal rank fusion reached a recall at four of 0.91 "
+     "compared with 0.78 for dense retrieval alone."),
+    ("Limitations", "Tables spanning several pages were split across "
+     "chunks, which hurt questions about torque specifications."),
+]
+
+SAMPLE_QUESTIONS = [
+    ("What programming languages do I know?", "Python, Go and Rust"),
+    ("Which databases have I worked with?", "PostgreSQL, MongoDB"),
+    ("What infrastructure tools are on my resume?", "Kubernetes, Terraform"),
+    ("Where did I study computer science?", "University of Edinburgh"),
+    ("What was my master's thesis about?", "consistent hashing"),
+    ("What did I do at Northwind Freight?", "event-sourced architecture"),
+    ("How much did I reduce latency?", "900 ms to 120 ms"),
+    ("How many records did the reconciliation pipeline process?",
+     "40 million"),
+    ("What open source project do I maintain?", "rate limiter library"),
+    ("Which certifications do I hold?", "Certified Kubernetes Administrator"),
+    ("How many years of experience do I have?", "nine years"),
+    ("How much did hybrid retrieval improve accuracy?", "14 points"),
+    ("How many pages does the dataset contain?", "12,400 pages"),
+    ("What recall did reciprocal rank fusion reach?", "0.91"),
+    ("What hurt the torque specification questions?", "Tables spanning"),
+    ("How large are the chunks?", "1,000 characters"),
+]
+
+
+def sample_document(title: str, sections: list, seed: int) -> str:
+    rng = random.Random(seed)
+    parts = [title]
+    for heading, body in sections:
+        filler = " ".join(rng.choice(FILLER) for _ in range(rng.randint(6, 12)))
+        parts.append(f"{heading}\n{filler} {body} "
+                     f"{' '.join(rng.choice(FILLER) for _ in range(6))}")
+    return "\n\n".join(parts)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic local embeddings: hashed, log-weighted word unigrams
+    and character trigrams
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dim, dtype="float32")
+        for word in re.findall(r"\w+", text.lower()):
+            grams = [word] + [word[i:i + 3] for i in range(len(word) - 2)]
+            for gram in grams:
+                bucket = int(hashlib.md5(gram.encode()).hexdigest(), 16)
+                vector[bucket % self.dim] += 1.0
+        vector = np.log1p(vector)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def keyword_query(question: str) -> str:
+    # Query rewriting PDFQATool used before hybrid retrieval
+    q = question.lower()
+    if any(w in q for w in ['skill', 'technology', 'programming', 'language', 'tool']):
+        return "skills technologies programming languages tools frameworks experience"
+    if any(w in q for w in ['experience', 'job', 'work', 'position']):
+        return "experience work job position employment history"
+    if any(w in q for w in ['education', 'degree', 'school', 'university']):
+        return "education degree school university college qualification"
+    return question
+
+
+def load_pdf(path: str) -> str:
+    pages = extract_page_range(path, 0, count_pages(path))
+    return "\n".join(pages) + "\n"
+
+
+def build_index(texts: list[str], embeddings: Embeddings) -> SessionIndex:
+    chunks, ids = [], []
+    for n, text in enumerate(texts):
+        for i, chunk in enumerate(splitter.split_text(text)):
+            chunks.append(chunk)
+            ids.append(f"doc{n}-{i}")
+    vectors = embeddings.embed_documents(chunks)
+    vector_store = FAISS.from_embeddings(
+        list(zip(chunks, vectors)), embeddings, ids=ids)
+    bm25 = BM25Index()
+    for chunk_id, chunk in zip(ids, chunks):
+        bm25.add(chunk_id, term_counts(chunk))
+    return SessionIndex(vector_store, bm25, {"eval": ids})
+
+
+async def run_strategy(name, session_index, question, k):
+    if name == "keyword":
+        return await session_index.vector_store.asimilarity_search(
+            keyword_query(question), k=k)
+    if name == "dense":
+        return await session_index.vector_store.asimilarity_search(
+            question, k=k)
+    if name == "bm25":
+        store = session_index.vector_store
+        return [store.docstore.search(chunk_id) for chunk_id, _ in
+                session_index.bm25.search(question, k)]
+    return await hybrid_search(session_index, question, k=k,
+                               mmr=name == "hybrid_mmr")
+
+
+async def evaluate(session_index, questions, k, repeat):
+    print(f"{len(session_index.vector_store.index_to_docstore_id)} chunks, "
+          f"{len(questions)} questions, k={k}")
+    print(f"{'strategy':<12}{'recall@k':>10}{'mrr':>8}"
+          f"{'p50 ms':>10}{'p95 ms':>10}")
+    for name in ("keyword", "dense", "bm25", "hybrid", "hybrid_mmr"):
+        found, reciprocal, timings = 0, 0.0, []
+        for question, answer in questions:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                docs = await run_strategy(name, session_index, question, k)
+                timings.append(time.perf_counter() - start)
+            ranks = [i for i, doc in enumerate(docs)
+                     if answer.lower() in doc.page_content.lower()]
+            if ranks:
+                found += 1
+                reciprocal += 1 / (ranks[0] + 1)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, math.ceil(0.95 * len(timings)) - 1)]
+        print(f"{name:<12}{found / len(questions):>10.2f}"
+              f"{reciprocal / len(questions):>8.2f}"
+              f"{statistics.median(timings) * 1000:>10.2f}"
+              f"{p95 * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--pdf", nargs="*", default=[])
+    parser.add_argument("--questions")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="timed runs per question")
+    parser.add_argument("--embeddings", choices=["hashing", "configured"],
+                        default="hashing")
+    args = parser.parse_args()
+
+    if args.pdf:
+        if not args.questions:
+            parser.error("--pdf needs --questions")
+        texts = [load_pdf(path) for path in args.pdf]
+        with open(args.questions) as f:
+            questions = [(q["question"], q["answer"]) for q in json.load(f)]
+    else:
+        texts = [sample_document("Curriculum Vitae", RESUME_SECTIONS, 1),
+                 sample_document("Technical Report", REPORT_SECTIONS, 2)]
+        questions = SAMPLE_QUESTIONS
+
+    embeddings = (HashingEmbeddings() if args.embeddings == "hashing"
+                  else llm_factory.get_embeddings())
+    retrieval.get_embeddings = lambda: embeddings
+
+    session_index = build_index(texts, embeddings)
+    asyncio.run(evaluate(session_index, questions, args.k, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
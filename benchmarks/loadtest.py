@@ -0,0 +1,413 @@
+"""
+Throughput and latency of the running service under concurrent load.
+
+Boots create_application() under uvicorn in a child process, pointed at
+the stub OpenAI/SerpAPI/arXiv backends from benchmarks.stub_backends and
+at an in-memory Mongo (mongomock-motor, --mongo memory) or a real one
+(--mongo MONGO_URI). Workers then drive one scenario for --duration
+seconds:
+
+    signup   POST /auth/signup with a new user each time
+    login    POST /auth/login
+    chat     POST /chat/send, cycling plain, web search and paper prompts
+    stream   POST /chat/send/stream, reports time to first token too
+    upload   POST /upload-pdf/... then polls the job until it finishes
+    mixed    all of the above, weighted towards chat
+
+Reports requests per second, p50/p95/p99 latency per operation and the
+server's event-loop lag (how late a 10 ms timer fires), which exposes
+blocking calls on the loop.
+
+    python -m benchmarks.loadtest --scenario chat --concurrency 32 \\
+        --duration 20 --llm-latency-ms 300 --tokens-per-second 50
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from benchmarks.stub_backends import add_latency_args
+
+PASSWORD = "loadtest-password"
+PROMPTS = [
+    "Explain the difference between threads and processes",
+    "Search the latest news about vector databases",
+    "Find papers on retrieval augmented generation",
+    "What is a good way to structure a FastAPI project",
+]
+MIXED_WEIGHTS = {"chat": 5, "stream": 3, "login": 1, "signup": 1,
+                 "upload": 1}
+LAG_INTERVAL = 0.01
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_pdf(pages: int) -> bytes:
+    """
+    Minimal text PDF with one line per page, no PDF library needed
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for i in range(pages):
+        text = (f"Page {i}: experience with python, education and "
+                f"skills in distributed systems.").encode()
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text + b") Tj ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream"
+                       % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R "
+                       b"/MediaBox [0 0 612 792] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> >> >>"
+                       % (len(objects)))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = (b"<< /Type /Pages /Kids [" + b" ".join(kids) +
+                  b"] /Count %d >>" % pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += (b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, xref))
+    return bytes(out)
+
+
+# --- server side, run in the child process -------------------------------
+
+def serve(args):
+    if args.mongo == "memory":
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("--mongo memory requires the 'mongomock-motor' package")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = \
+            mongomock_motor.AsyncMongoMockClient
+
+    import uvicorn
+    from app.main import create_application
+
+    app = create_application()
+    lags = []
+
+    async def monitor_loop_lag():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            lags.append(time.perf_counter() - start - LAG_INTERVAL)
+
+    @app.get("/__loadtest/lag")
+    async def loop_lag(reset: bool = False):
+        report = {
+            "samples": len(lags),
+            "p50_ms": percentile(lags, 50) * 1000,
+            "p99_ms": percentile(lags, 99) * 1000,
+            "max_ms": max(lags, default=0.0) * 1000,
+        }
+        if reset:
+            lags.clear()
+        return report
+
+    async def main():
+        config = uvicorn.Config(app, host="127.0.0.1", port=args.app_port,
+                                log_level="warning")
+        monitor = asyncio.create_task(monitor_loop_lag())
+        try:
+            await uvicorn.Server(config).serve()
+        finally:
+            monitor.cancel()
+
+    asyncio.run(main())
+
+
+# --- client side ---------------------------------------------------------
+
+class LoadClient:
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.api = "/api/v1"
+        self.results = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.prompts = itertools.cycle(PROMPTS)
+        self.pdf = make_pdf(args.pdf_pages)
+        self.users = []
+
+    async def timed(self, op, coro):
+        start = time.perf_counter()
+        try:
+            response = await coro
+        except Exception:
+            self.errors[op] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        if response is not None and response.status_code >= 400:
+            self.errors[op] += 1
+            return None
+        self.results[op].append(elapsed)
+        return response
+
+    async def create_user(self):
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        await self.client.post(f"{self.api}/auth/signup",
+                               json={"email": email, "password": PASSWORD})
+        response = await self.client.post(
+            f"{self.api}/auth/login",
+            json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        return {"email": email,
+                "headers": {"Authorization": f"Bearer {token}"}}
+
+    async def signup(self, worker):
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        await self.timed("signup", self.client.post(
+            f"{self.api}/auth/signup",
+            json={"email": email, "password": PASSWORD}))
+
+    async def login(self, worker):
+        await self.timed("login", self.client.post(
+            f"{self.api}/auth/login",
+            json={"email": worker["email"], "password": PASSWORD}))
+
+    async def chat(self, worker):
+        await self.timed("chat", self.client.post(
+            f"{self.api}/chat/send", headers=worker["headers"],
+            json={"user_input": next(self.prompts),
+                  "session_id": worker["session_id"]}))
+
+    async def stream(self, worker):
+        start = time.perf_counter()
+        first_token = None
+        try:
+            async with self.client.stream(
+                    "POST", f"{self.api}/chat/send/stream",
+                    headers=worker["headers"],
+                    json={"user_input": next(self.prompts),
+                          "session_id": worker["session_id"]}) as response:
+                if response.status_code >= 400:
+                    self.errors["stream"] += 1
+                    return
+                async for line in response.aiter_lines():
+                    if first_token is None and line == "event: token":
+                        first_token = time.perf_counter() - start
+                    if line == "event: error":
+                        self.errors["stream"] += 1
+                        return
+        except Exception:
+            self.errors["stream"] += 1
+            return
+        self.results["stream"].append(time.perf_counter() - start)
+        if first_token is not None:
+            self.results["stream_first_token"].append(first_token)
+
+    async def upload(self, worker):
+        start = time.perf_counter()
+        response = await self.timed("upload", self.client.post(
+            f"{self.api}/upload-pdf/sessions/{worker['session_id']}/upload-pdf",
+            headers=worker["headers"],
+            files={"file": ("load.pdf", self.pdf, "application/pdf")}))
+        if response is None:
+            return
+
+        job_id = response.json()["job_id"]
+        while True:
+            await asyncio.sleep(0.1)
+            job = await self.client.get(
+                f"{self.api}/upload-pdf/jobs/{job_id}",
+                headers=worker["headers"])
+            status = job.json().get("status")
+            if status == "done":
+                self.results["upload_job"].append(time.perf_counter() - start)
+                return
+            if status == "failed" or job.status_code >= 400:
+                self.errors["upload_job"] += 1
+                return
+
+    async def run_worker(self, worker, deadline):
+        ops = ([self.args.scenario] if self.args.scenario != "mixed" else
+               random.choices(list(MIXED_WEIGHTS),
+                              weights=list(MIXED_WEIGHTS.values()), k=10000))
+        for op in itertools.cycle(ops):
+            if time.perf_counter() >= deadline:
+                return
+            await getattr(self, op)(worker)
+
+
+async def wait_until_up(client, path, process, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"server exited with code {process.returncode}")
+        try:
+            if (await client.get(path)).status_code < 500:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    sys.exit(f"server did not come up: {path}")
+
+
+async def drive(args, app_url, stub_url, processes):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=app_url, limits=limits,
+                                 timeout=args.request_timeout) as client:
+        await wait_until_up(client, f"{stub_url}/docs", processes[0])
+        await wait_until_up(client, "/api/v1/health/health", processes[1])
+
+        load = LoadClient(client, args)
+        users = await asyncio.gather(*(
+            load.create_user() for _ in range(min(args.users,
+                                                  args.concurrency))))
+        workers = [{**users[i % len(users)], "session_id": str(uuid.uuid4())}
+                   for i in range(args.concurrency)]
+
+        # Warm-up pass, not measured
+        await asyncio.gather(*(load.run_worker(
+            worker, time.perf_counter() + args.warmup) for worker in workers))
+        load.results.clear()
+        load.errors.clear()
+        await client.get("/__loadtest/lag", params={"reset": True})
+
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(load.run_worker(worker, deadline)
+                               for worker in workers))
+        elapsed = time.perf_counter() - start
+        lag = (await client.get("/__loadtest/lag")).json()
+
+    return load, elapsed, lag
+
+
+def report(args, load, elapsed, lag):
+    print(f"scenario={args.scenario} concurrency={args.concurrency} "
+          f"duration={elapsed:.1f}s mongo={args.mongo}")
+    print(f"{'operation':<20}{'count':>8}{'errors':>8}{'rps':>9}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op in sorted(set(load.results) | set(load.errors)):
+        values = load.results.get(op, [])
+        print(f"{op:<20}{len(values):>8}{load.errors.get(op, 0):>8}"
+              f"{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 50) * 1000:>10.1f}"
+              f"{percentile(values, 95) * 1000:>10.1f}"
+              f"{percentile(values, 99) * 1000:>10.1f}")
+    print(f"event-loop lag: p50 {lag['p50_ms']:.1f} ms, "
+          f"p99 {lag['p99_ms']:.1f} ms, max {lag['max_ms']:.1f} ms "
+          f"({lag['samples']} samples)")
+    if args.json:
+        print(json.dumps({
+            "scenario": args.scenario, "concurrency": args.concurrency,
+            "elapsed": elapsed, "loop_lag": lag,
+            "operations": {
+                op: {"count": len(values), "errors": load.errors.get(op, 0),
+                     "rps": len(values) / elapsed,
+                     "mean_ms": statistics.fmean(values) * 1000,
+                     "p50_ms": percentile(values, 50) * 1000,
+                     "p95_ms": percentile(values, 95) * 1000,
+                     "p99_ms": percentile(values, 99) * 1000}
+                for op, values in load.results.items() if values
+            }
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenario", default="chat",
+                        choices=["signup", "login", "chat", "stream",
+                                 "upload", "mixed"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--users", type=int, default=8,
+                        help="distinct logged-in users shared by workers")
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--mongo", default="memory",
+                        help="'memory' for mongomock-motor, or a MONGO_URI")
+    parser.add_argument("--json", action="store_true",
+                        help="also print the results as JSON")
+    parser.add_argument("--app-port", type=int, default=0)
+    parser.add_argument("--stub-port", type=int, default=0)
+    parser.add_argument("--serve", action="store_true",
+                        help=argparse.SUPPRESS)
+    add_latency_args(parser)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    args.app_port = args.app_port or free_port()
+    args.stub_port = args.stub_port or free_port()
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+
+    latency_args = [
+        "--llm-latency-ms", str(args.llm_latency_ms),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--answer-tokens", str(args.answer_tokens),
+        "--embed-latency-ms", str(args.embed_latency_ms),
+        "--embed-dim", str(args.embed_dim),
+        "--tool-latency-ms", str(args.tool_latency_ms),
+    ]
+    env = {
+        **os.environ,
+        "MONGO_URI": (os.environ.get("MONGO_URI", "mongodb://localhost")
+                      if args.mongo == "memory" else args.mongo),
+        "MONGO_DB": os.environ.get("MONGO_DB", "loadtest"),
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "SERPAPI_API_KEY": "loadtest",
+        "SERPAPI_URL": f"{stub_url}/serpapi/search.json",
+        "ARXIV_API_URL": f"{stub_url}/arxiv/api/query",
+        # A few users drive all the load; measure capacity, not quotas
+        "RATE_LIMIT_ENABLED": os.environ.get("RATE_LIMIT_ENABLED", "false"),
+    }
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.stub_backends",
+                          "--port", str(args.stub_port), *latency_args]),
+        subprocess.Popen([sys.executable, "-m", "benchmarks.loadtest",
+                          "--serve", "--mongo", args.mongo,
+                          "--app-port", str(args.app_port)], env=env),
+    ]
+    try:
+        load, elapsed, lag = asyncio.run(
+            drive(args, app_url, stub_url, processes))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    report(args, load, elapsed, lag)
+
+
+if __name__ == "__main__":
+    main()
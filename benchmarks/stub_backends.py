@@ -0,0 +1,217 @@
+"""
+Local stand-ins for the services the app calls: an OpenAI-compatible
+chat/embeddings API and the SerpAPI and arXiv search endpoints.
+
+Chat completions wait --llm-latency-ms before the first token, then
+produce --answer-tokens tokens at --tokens-per-second, streamed or not.
+Inputs mentioning papers or searching make the model call the matching
+tool, both in ReAct text form and as OpenAI tool calls.
+
+    python -m benchmarks.stub_backends --port 9100 --llm-latency-ms 300
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1,
+SERPAPI_URL=http://127.0.0.1:9100/serpapi/search.json and
+ARXIV_API_URL=http://127.0.0.1:9100/arxiv/api/query.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+import uuid
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+ARXIV_ENTRY = """<entry>
+<id>http://arxiv.org/abs/2401.0000{i}v1</id>
+<title>Stub paper {i} on {query}</title>
+<author><name>A. Author</name></author>
+<author><name>B. Author</name></author>
+</entry>"""
+
+
+def tool_for(text: str) -> list[str]:
+    """
+    Tools a stub model would pick for an input
+    """
+    text = text.lower()
+    tools = []
+    if "paper" in text or "arxiv" in text:
+        tools.append("research_papers")
+    if "search" in text or "news" in text or "latest" in text:
+        tools.append("web_search")
+    return tools
+
+
+def react_input(prompt: str) -> str:
+    # The conversational ReAct prompt ends with "New input: ..."
+    return prompt.rsplit("New input:", 1)[-1].split("\n", 1)[0].strip()
+
+
+def choose_reply(body: dict, answer: str) -> dict:
+    """
+    Assistant message for a chat completion request: a tool call for
+    tool-worthy inputs, otherwise the canned answer
+    """
+    messages = body.get("messages", [])
+    last = messages[-1] if messages else {}
+    content = last.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content)
+
+    if body.get("tools"):
+        if any(m.get("role") == "tool" for m in messages):
+            return {"role": "assistant", "content": answer}
+        calls = [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": name,
+                         "arguments": json.dumps({"query": content[:200]})}
+        } for name in tool_for(content)]
+        if calls:
+            return {"role": "assistant", "content": None,
+                    "tool_calls": calls}
+        return {"role": "assistant", "content": answer}
+
+    if "New input:" in content:
+        user_input = react_input(content)
+        tools = tool_for(user_input)
+        if tools and "Observation:" not in content.rsplit("New input:", 1)[-1]:
+            return {"role": "assistant", "content": (
+                "Thought: Do I need to use a tool? Yes\n"
+                f"Action: {tools[0]}\nAction Input: {user_input}")}
+        return {"role": "assistant", "content": (
+            f"Thought: Do I need to use a tool? No\nAI: {answer}")}
+
+    return {"role": "assistant", "content": answer}
+
+
+def fake_vector(text, dim: int) -> list[float]:
+    """
+    Deterministic unit vector for a string or token list
+    """
+    seed = hashlib.sha256(repr(text).encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(seed[:8], "little"))
+    vector = rng.standard_normal(dim).astype("float32")
+    return vector / np.linalg.norm(vector)
+
+
+def create_stub_app(args) -> FastAPI:
+    app = FastAPI(title="stub backends")
+    answer_words = ["stub"] * args.answer_tokens
+    token_delay = 1.0 / args.tokens_per_second
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": "chatcmpl-stub", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": "stub",
+            "choices": [{"index": 0, "delta": delta,
+                         "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        reply = choose_reply(body, " ".join(answer_words))
+        await asyncio.sleep(args.llm_latency_ms / 1000)
+
+        if not body.get("stream"):
+            if reply.get("content"):
+                await asyncio.sleep(token_delay * len(reply["content"].split()))
+            return JSONResponse({
+                "id": "chatcmpl-stub", "object": "chat.completion",
+                "created": int(time.time()), "model": "stub",
+                "choices": [{
+                    "index": 0, "message": reply,
+                    "finish_reason": ("tool_calls" if reply.get("tool_calls")
+                                      else "stop")
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0,
+                          "total_tokens": 0}
+            })
+
+        async def events():
+            if reply.get("tool_calls"):
+                calls = [{**call, "index": i}
+                         for i, call in enumerate(reply["tool_calls"])]
+                yield chunk({"role": "assistant", "tool_calls": calls})
+                yield chunk({}, "tool_calls")
+            else:
+                words = reply["content"].split(" ")
+                for i, word in enumerate(words):
+                    yield chunk({"content": word if i == 0 else " " + word})
+                    await asyncio.sleep(token_delay)
+                yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        await asyncio.sleep(args.embed_latency_ms / 1000)
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_vector(text, args.embed_dim)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i,
+                         "embedding": embedding})
+        return {"object": "list", "data": data, "model": "stub",
+                "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+
+    @app.get("/serpapi/search.json")
+    async def serpapi(q: str = ""):
+        await asyncio.sleep(args.tool_latency_ms / 1000)
+        return {"organic_results": [{
+            "title": f"Result {i} for {q}",
+            "link": f"https://example.com/{i}",
+            "snippet": f"Stub snippet {i} about {q}."
+        } for i in range(1, 4)]}
+
+    @app.get("/arxiv/api/query")
+    async def arxiv(search_query: str = ""):
+        await asyncio.sleep(args.tool_latency_ms / 1000)
+        query = re.sub(r"[<>&]", "", search_query.removeprefix("all:"))
+        entries = "".join(ARXIV_ENTRY.format(i=i, query=query)
+                          for i in range(1, 4))
+        feed = f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'
+        return Response(feed, media_type="application/atom+xml")
+
+    return app
+
+
+def add_latency_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0,
+                        help="time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0)
+    parser.add_argument("--embed-dim", type=int, default=256)
+    parser.add_argument("--tool-latency-ms", type=float, default=200.0,
+                        help="SerpAPI and arXiv response time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_latency_args(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(args), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings for running the API behind a process manager:
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Gunicorn supervises WORKERS uvicorn workers, restarting any that die.
+The app is not preloaded: every worker imports it after the fork and
+runs its own lifespan, so Mongo clients, thread pools and event loops
+are never shared across processes.
+"""
+from app.core.config import settings
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = False
+
+# Streamed chat turns can run for a while; give them time to finish on
+# shutdown and don't kill workers that are busy streaming
+graceful_timeout = int(settings.GRACEFUL_SHUTDOWN_SECONDS)
+timeout = 120
+keepalive = 5
+
+forwarded_allow_ips = "*"
+accesslog = "-"
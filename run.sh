@@ -1,5 +1,10 @@
 # Activate virtual environment
 source .venv/bin/activate
 
-# Start FastAPI server
-uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+if [ "$1" = "prod" ]; then
+    # WORKERS processes with graceful shutdown (see gunicorn.conf.py)
+    exec gunicorn app.main:app -c gunicorn.conf.py
+else
+    # Start FastAPI server with auto-reload
+    uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+fi
@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "test")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+try:
+    import mongomock_motor
+    import motor.motor_asyncio
+except ImportError:  # optional, only needed by the API tests
+    mongomock_motor = None
+else:
+    # In-memory MongoDB; must be in place before app.db.mongo is imported
+    motor.motor_asyncio.AsyncIOMotorClient = (
+        mongomock_motor.AsyncMongoMockClient)
+
+
+@pytest.fixture
+def app():
+    """
+    The API on an in-memory database, authenticating each request as the
+    user named in its X-Test-User header
+    """
+    if mongomock_motor is None:
+        pytest.skip("the API tests need mongomock-motor")
+    from fastapi import Header
+    from app.api.v1.auth import get_current_user
+    from app.api.v1.schemas import UserDB
+    from app.core import rate_limit
+    from app.core.config import settings
+    from app.db.mongo import client
+    from app.main import create_application
+
+    async def test_user(x_test_user: str = Header()):
+        return UserDB(id=x_test_user)
+
+    application = create_application()
+    application.dependency_overrides[get_current_user] = test_user
+    yield application
+    asyncio.run(client.drop_database(settings.MONGO_DB))
+    rate_limit._limiter = None
+
+
+@pytest.fixture
+def client_for(app):
+    """
+    An HTTP client of the API acting as `user_id`
+    """
+    def make(user_id: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test",
+            headers={"X-Test-User": user_id})
+    return make
@@ -0,0 +1,62 @@
+import asyncio
+from langchain.docstore.document import Document
+from app import context_packing
+from app.context_packing import map_reduce_context, pack_context
+
+
+def chunk(chunk_id: str, text: str) -> Document:
+    return Document(id=chunk_id, page_content=text)
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def test_pack_context_fits_the_budget(monkeypatch):
+    monkeypatch.setattr(context_packing, "count_tokens", count_words)
+    ranked = [chunk("c2", "two " * 6), chunk("c0", "zero " * 6),
+              chunk("c9", "duplicate " * 3), chunk("c8", "duplicate " * 3),
+              chunk("c1", "one " * 6), chunk("c5", "five " * 2)]
+    order = {f"c{i}": (0, i) for i in range(10)}
+
+    passages, tokens = pack_context(ranked, order, budget=17)
+
+    # c1 doesn't fit after c2, c0 and one duplicate; c5 further down does
+    assert tokens == 17
+    texts = [p.page_content.split()[0] for p in passages]
+    assert texts == ["zero", "two", "five", "duplicate"]
+
+
+def test_pack_context_merges_neighbours_without_overlap(monkeypatch):
+    monkeypatch.setattr(context_packing, "count_tokens", count_words)
+    first = chunk("c0", "alpha beta gamma delta")
+    second = chunk("c1", "gamma delta epsilon")
+    passages, _ = pack_context([second, first],
+                               {"c0": (0, 0), "c1": (0, 1)}, budget=100)
+    assert [p.page_content for p in passages] == [
+        "alpha beta gamma delta\nepsilon"]
+
+
+def test_map_reduce_maps_every_group_within_concurrency(monkeypatch):
+    monkeypatch.setattr(context_packing, "count_tokens", count_words)
+    calls, active = [], [0, 0]
+
+    class FakeMapChain:
+        async def ainvoke(self, inputs, config=None):
+            active[0] += 1
+            active[1] = max(active)
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            calls.append(inputs["context"])
+            return "note"
+
+    monkeypatch.setattr(context_packing, "get_map_chain", FakeMapChain)
+    chunks = [chunk(f"c{i}", f"word{i} " * 5) for i in range(20)]
+    order = {f"c{i}": (0, i) for i in range(20)}
+
+    notes = asyncio.run(map_reduce_context(
+        "summarize", chunks, order, budget=10, concurrency=3, callbacks=[]))
+
+    assert all(f"word{i}" in " ".join(calls) for i in range(20))
+    assert active[1] == 3
+    assert notes and sum(count_words(n.page_content) for n in notes) <= 10
@@ -0,0 +1,50 @@
+import asyncio
+from app import intent_router
+from app.core.config import settings
+from app.intent_router import AGENT, CHAT, PDF, route_by_rules
+from benchmarks.eval_intent_router import FILENAMES, TEST_SET
+
+
+def route_test_set() -> list[tuple[str, str, str]]:
+    router = intent_router.IntentRouter(
+        intent_router.EXAMPLES, k=settings.INTENT_ROUTER_K,
+        chat_margin=settings.INTENT_ROUTER_CHAT_MARGIN)
+
+    async def scenario():
+        routed = []
+        for user_input, has_documents, expected in TEST_SET:
+            got, _ = await router.route(
+                user_input, FILENAMES if has_documents else [])
+            routed.append((user_input, expected, got))
+        return routed
+
+    return asyncio.run(scenario())
+
+
+def test_default_config_routes_the_test_set(monkeypatch):
+    # The default: remote embeddings, so rules only
+    monkeypatch.setattr(settings, "INTENT_ROUTER_EMBEDDINGS", None)
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "openai")
+    routed = route_test_set()
+
+    misses = [(i, e, got) for i, e, got in routed if e != got]
+    assert len(misses) <= 2, misses
+    # Misses may only cost time: never a wrong PDF or a lost tool
+    assert [m for m in misses if m[1:] != (CHAT, AGENT)] == []
+
+
+def test_personal_questions_need_documents():
+    question = "Which companies have I worked for?"
+    assert route_by_rules(question, FILENAMES) == PDF
+    assert route_by_rules(question, []) is None
+
+
+def test_file_names_with_underscores():
+    question = "what does resume_2024 say about leadership?"
+    assert route_by_rules(question, ["resume_2024.pdf"]) == PDF
+    assert route_by_rules("summary of q3_report", ["q3_report.pdf"]) == PDF
+
+
+def test_agent_cues_beat_chat_requests():
+    assert route_by_rules("write a summary of the latest news", []) == AGENT
+    assert route_by_rules("explain how a hash map works", []) == CHAT
@@ -0,0 +1,82 @@
+import asyncio
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from app import pdf_index
+from app.db.mongo import pdf_indexes_collection
+from app.embeddings import CachedEmbeddings
+
+TEXTS = {name: f"{name} " + " ".join(f"{name}{i} word" for i in range(400))
+         for name in ("alpha", "beta", "gamma")}
+
+
+def use_fake_embeddings(monkeypatch):
+    embeddings = CachedEmbeddings(DeterministicFakeEmbedding(size=16), "fake")
+    monkeypatch.setattr(pdf_index, "get_embeddings", lambda: embeddings)
+    pdf_index._index_cache.clear()
+
+
+def count_builds(monkeypatch) -> list:
+    builds = []
+    build = pdf_index._build
+
+    async def counting(doc):
+        if doc is not None:
+            builds.append(list(doc["documents"]))
+        return await build(doc)
+
+    monkeypatch.setattr(pdf_index, "_build", counting)
+    return builds
+
+
+async def add(session_id: str, name: str):
+    return await pdf_index.add_document(
+        session_id, pdf_index.content_hash(TEXTS[name]), TEXTS[name],
+        f"{name}.pdf")
+
+
+def test_updates_start_from_the_cached_index(app, monkeypatch):
+    use_fake_embeddings(monkeypatch)
+    builds = count_builds(monkeypatch)
+
+    async def scenario():
+        await add("s", "alpha")
+        before = await pdf_index.get_index("s")
+        await add("s", "beta")
+        after = await pdf_index.get_index("s")
+        await pdf_index.remove_document(
+            "s", pdf_index.content_hash(TEXTS["alpha"]))
+        return before, after, await pdf_index.get_index("s")
+
+    before, after, removed = asyncio.run(scenario())
+    assert builds == []
+    assert list(before.filenames.values()) == ["alpha.pdf"]
+    assert list(after.filenames.values()) == ["alpha.pdf", "beta.pdf"]
+    assert after.vector_store.index.ntotal == (
+        before.vector_store.index.ntotal + len(
+            after.documents[pdf_index.content_hash(TEXTS["beta"])]))
+    assert list(removed.filenames.values()) == ["beta.pdf"]
+    assert removed.vector_store.index.ntotal == len(removed.bm25.lengths)
+
+
+def test_conflicting_writer_forces_a_rebuild(app, monkeypatch):
+    use_fake_embeddings(monkeypatch)
+
+    async def scenario():
+        await add("s", "alpha")
+        await add("s", "beta")
+        # Another worker removed beta: the stored version moved on
+        doc = await pdf_indexes_collection.find_one({"_id": "s"})
+        beta = pdf_index.content_hash(TEXTS["beta"])
+        await pdf_indexes_collection.update_one(
+            {"_id": "s"},
+            {"$set": {"version": doc["version"] + 1,
+                      "documents": {k: v for k, v in doc["documents"].items()
+                                    if k != beta}}})
+        builds = count_builds(monkeypatch)
+        await add("s", "gamma")
+        return builds, await pdf_index.get_index("s")
+
+    builds, session_index = asyncio.run(scenario())
+    assert builds == [[pdf_index.content_hash(TEXTS["alpha"])]]
+    assert list(session_index.filenames.values()) == ["alpha.pdf", "gamma.pdf"]
+    assert session_index.vector_store.index.ntotal == len(
+        session_index.bm25.lengths)
@@ -0,0 +1,68 @@
+import asyncio
+import io
+from app import pdf_store
+from app.api.v1 import chat_pdf
+from app.db.mongo import jobs_collection, pdf_blobs_collection
+from app.pdf_ingest import fetch_upload
+from app.pdf_store import drop_upload, save_upload
+
+DATA = bytes(range(256)) * 40
+
+
+def test_stored_upload_round_trips(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_store, "BLOB_PART_BYTES", 1000)
+
+    async def scenario():
+        source = io.BytesIO(DATA)
+
+        async def read(size):
+            return source.read(size)
+
+        upload = await save_upload(read)
+        path = await fetch_upload(upload, str(tmp_path))
+        stored = await pdf_blobs_collection.count_documents({})
+        await drop_upload(upload)
+        left = await pdf_blobs_collection.count_documents({})
+        return upload, path, stored, left
+
+    upload, path, parts, left = asyncio.run(scenario())
+    assert upload["parts"] == parts == 11
+    assert open(path, "rb").read() == DATA
+    assert left == 0
+
+
+def test_failed_enqueue_drops_the_upload(client_for, monkeypatch):
+    async def failing_enqueue(*args, **kwargs):
+        raise RuntimeError("jobs collection unavailable")
+
+    monkeypatch.setattr(chat_pdf, "enqueue_job", failing_enqueue)
+
+    async def scenario():
+        async with client_for("alice") as alice:
+            res = await alice.post(
+                "/api/v1/upload-pdf/sessions/s1/upload-pdf",
+                files={"file": ("cv.pdf", DATA, "application/pdf")})
+        return (res, await pdf_blobs_collection.count_documents({}),
+                await jobs_collection.count_documents({}))
+
+    res, blobs, jobs = asyncio.run(scenario())
+    assert res.status_code == 500
+    assert blobs == 0
+    assert jobs == 0
+
+
+def test_upload_is_queued_with_its_stored_bytes(client_for):
+    async def scenario():
+        async with client_for("alice") as alice:
+            res = await alice.post(
+                "/api/v1/upload-pdf/sessions/s1/upload-pdf",
+                files={"file": ("cv.pdf", DATA, "application/pdf")})
+        job = await jobs_collection.find_one({"_id": res.json()["job_id"]})
+        parts = [part async for part in
+                 pdf_store.read_upload(job["payload"]["upload"])]
+        return res, job, b"".join(parts)
+
+    res, job, data = asyncio.run(scenario())
+    assert res.status_code == 202
+    assert job["user_id"] == "alice"
+    assert data == DATA
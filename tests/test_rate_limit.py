@@ -0,0 +1,69 @@
+import asyncio
+from app import chat_stream
+from app.api.v1 import chat
+from app.api.v1.limits import chat_limit
+
+
+async def fake_bot_response(user_id, session_id, user_input, callbacks=None):
+    return "ok"
+
+
+def test_headers_and_rate_limit(client_for, monkeypatch):
+    monkeypatch.setattr(chat, "get_bot_response", fake_bot_response)
+    monkeypatch.setattr(chat_limit, "burst", 2)
+    monkeypatch.setattr(chat_limit, "rate", 1 / 60)
+
+    async def scenario():
+        async with client_for("alice") as alice:
+            return [await alice.post("/api/v1/chat/send",
+                                     json={"user_input": "hi"})
+                    for _ in range(3)]
+
+    first, second, third = asyncio.run(scenario())
+    assert first.status_code == second.status_code == 200
+    assert first.headers["RateLimit-Limit"] == "2"
+    assert first.headers["RateLimit-Remaining"] == "1"
+    assert second.headers["RateLimit-Remaining"] == "0"
+    assert third.status_code == 429
+    assert int(third.headers["Retry-After"]) > 0
+
+
+def test_slot_is_held_until_the_turn_finishes(client_for, monkeypatch):
+    monkeypatch.setattr(chat_limit, "concurrency", 1)
+    finish = asyncio.Event()
+    finished = asyncio.Event()
+
+    async def slow_bot_response(user_id, session_id, user_input,
+                                callbacks=None):
+        await finish.wait()
+        finished.set()
+        return "late"
+
+    monkeypatch.setattr(chat_stream, "get_bot_response", slow_bot_response)
+
+    async def scenario():
+        async with client_for("alice") as alice:
+            async def stream():
+                async with alice.stream("POST", "/api/v1/chat/send/stream",
+                                        json={"user_input": "hi"}) as res:
+                    async for _ in res.aiter_bytes():
+                        pass
+
+            # The client goes away while the turn runs on
+            client = asyncio.create_task(stream())
+            await asyncio.sleep(0.1)
+            client.cancel()
+            await asyncio.sleep(0.05)
+            during = await alice.post("/api/v1/chat/send/stream",
+                                      json={"user_input": "hi"})
+            finish.set()
+            await finished.wait()
+            await asyncio.sleep(0.05)
+            after = await alice.post("/api/v1/chat/send/stream",
+                                     json={"user_input": "hi"})
+            return during, after
+
+    during, after = asyncio.run(scenario())
+    assert during.status_code == 429
+    assert after.status_code == 200
+    assert '"response": "late"' in after.text
@@ -0,0 +1,85 @@
+import asyncio
+from app.api.v1 import chat
+from app.db.messages import append_messages
+from app.db.mongo import sessions_collection
+from app.jobs import enqueue_job
+
+
+async def fake_bot_response(user_id, session_id, user_input, callbacks=None):
+    await append_messages(session_id, user_id, [
+        {"type": "human", "content": user_input},
+        {"type": "ai", "content": "ok"}])
+    return "ok"
+
+
+def test_send_rejects_another_users_session(client_for, monkeypatch):
+    monkeypatch.setattr(chat, "get_bot_response", fake_bot_response)
+
+    async def scenario():
+        async with client_for("alice") as alice, client_for("bob") as bob:
+            created = await alice.post("/api/v1/chat/send",
+                                       json={"user_input": "hi"})
+            session_id = created.json()["session_id"]
+            intruder = await bob.post(
+                "/api/v1/chat/send",
+                json={"user_input": "hi", "session_id": session_id})
+            stream = await bob.post(
+                "/api/v1/chat/send/stream",
+                json={"user_input": "hi", "session_id": session_id})
+            owner = await alice.post(
+                "/api/v1/chat/send",
+                json={"user_input": "again", "session_id": session_id})
+            session = await sessions_collection.find_one(
+                {"session_id": session_id})
+            return created, intruder, stream, owner, session
+
+    created, intruder, stream, owner, session = asyncio.run(scenario())
+    assert created.status_code == 200
+    assert intruder.status_code == 404
+    assert stream.status_code == 404
+    assert owner.status_code == 200
+    assert session["user_id"] == "alice"
+    assert session["message_count"] == 4
+
+
+def test_append_never_changes_the_owner(app):
+    async def scenario():
+        await append_messages("s1", "alice", [{"type": "human",
+                                               "content": "hi"}])
+        await append_messages("s1", "bob", [{"type": "human",
+                                             "content": "hi"}])
+        return await sessions_collection.find_one({"session_id": "s1"})
+
+    session = asyncio.run(scenario())
+    assert session["user_id"] == "alice"
+    assert session["message_count"] == 2
+
+
+def test_documents_and_jobs_belong_to_their_owner(client_for):
+    async def scenario():
+        await sessions_collection.insert_one({
+            "session_id": "s1", "user_id": "alice",
+            "documents": [{"content_hash": "a" * 64, "filename": "cv.pdf"}]})
+        job_id = await enqueue_job("pdf_upload", {}, user_id="alice")
+        async with client_for("alice") as alice, client_for("bob") as bob:
+            base = "/api/v1/upload-pdf"
+            return {
+                "bob list": (await bob.get(
+                    f"{base}/sessions/s1/documents")).status_code,
+                "bob delete": (await bob.delete(
+                    f"{base}/sessions/s1/documents/{'a' * 64}")).status_code,
+                "bob upload": (await bob.post(
+                    f"{base}/sessions/s1/upload-pdf",
+                    files={"file": ("x.pdf", b"%PDF", "application/pdf")}
+                )).status_code,
+                "bob job": (await bob.get(
+                    f"{base}/jobs/{job_id}")).status_code,
+                "alice list": (await alice.get(
+                    f"{base}/sessions/s1/documents")).status_code,
+                "alice job": (await alice.get(
+                    f"{base}/jobs/{job_id}")).status_code,
+            }
+
+    assert asyncio.run(scenario()) == {
+        "bob list": 404, "bob delete": 404, "bob upload": 404,
+        "bob job": 404, "alice list": 200, "alice job": 200}
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.db.mongo import sessions_collection
+from app.pdf_ingest import list_document
+
+
+def page_through(client_for, user_id: str, limit: int) -> list[str]:
+    async def scenario():
+        seen, cursor = [], None
+        async with client_for(user_id) as client:
+            while True:
+                params = {"limit": limit}
+                if cursor:
+                    params["cursor"] = cursor
+                res = await client.get("/api/v1/chat/sessions", params=params)
+                assert res.status_code == 200
+                page = res.json()
+                seen += [s["session_id"] for s in page["sessions"]]
+                cursor = page["next_cursor"]
+                if not cursor:
+                    return seen
+    return asyncio.run(scenario())
+
+
+def test_pages_cover_every_session_once(client_for):
+    start = datetime(2025, 1, 1)
+    docs = [{"session_id": f"s{i}", "user_id": "alice",
+             "updated_at": start + timedelta(minutes=i // 2)}
+            for i in range(7)]
+    docs += [{"session_id": f"undated{i}", "user_id": "alice"}
+             for i in range(3)]
+    docs.append({"session_id": "other", "user_id": "bob",
+                 "updated_at": start})
+    asyncio.run(sessions_collection.insert_many(docs))
+
+    for limit in (1, 2, 3, 20):
+        seen = page_through(client_for, "alice", limit)
+        assert sorted(seen) == sorted(d["session_id"] for d in docs[:-1])
+        assert seen[:7] == [f"s{i}" for i in (6, 5, 4, 3, 2, 1, 0)]
+
+
+def test_upload_created_session_is_listed(client_for):
+    async def scenario():
+        await list_document("uploaded", "a" * 64, "cv.pdf", 1,
+                            user_id="alice")
+        return await sessions_collection.find_one({"session_id": "uploaded"})
+
+    session = asyncio.run(scenario())
+    assert isinstance(session["updated_at"], datetime)
+    assert page_through(client_for, "alice", 1) == ["uploaded"]
+
+
+def test_invalid_cursor(client_for):
+    async def scenario():
+        async with client_for("alice") as client:
+            return await client.get("/api/v1/chat/sessions",
+                                    params={"cursor": "garbage!"})
+
+    assert asyncio.run(scenario()).status_code == 400
@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "test")
+
+from app.core.cache import SingleFlight  # noqa: E402
+
+
+def test_leader_timeout_does_not_cancel_joiners():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return "result"
+
+        leader = asyncio.wait_for(flight.do("key", fetch), timeout=0.05)
+        joiner = asyncio.wait_for(flight.do("key", fetch), timeout=1.0)
+        return await asyncio.gather(leader, joiner,
+                                    return_exceptions=True), calls
+
+    (leader, joiner), calls = asyncio.run(scenario())
+    assert isinstance(leader, asyncio.TimeoutError)
+    assert joiner == ("result", True)
+    assert len(calls) == 1
+
+
+def test_cancelled_caller_leaves_call_running():
+    async def scenario():
+        flight = SingleFlight()
+        done = asyncio.Event()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            done.set()
+            return "result"
+
+        caller = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.wait_for(done.wait(), timeout=1.0)
+        # Finished calls are forgotten; the next caller runs its own
+        await asyncio.sleep(0)
+        return await flight.do("key", fetch)
+
+    assert asyncio.run(scenario()) == ("result", False)
+
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        return await asyncio.gather(flight.do("key", fetch),
+                                    flight.do("key", fetch),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)